@@ -1,8 +1,13 @@
 import copy
+import hashlib
+import itertools
+import json
 import threading
+import traceback
 
 from contextlib import contextmanager
 from functools import wraps
+from multiprocessing.pool import ThreadPool
 from string import Template
 
 import blinker
@@ -10,7 +15,9 @@ import blinker
 from bunch import Bunch, bunchify
 
 from loader import Loader
+from local import ContextLocal
 from monitor import SourceMonitor
+from snapshot import SnapshotCache
 
 
 def synchronized(lock):
@@ -25,29 +32,407 @@ def synchronized(lock):
     return wrap
 
 
+# namespace -> config snapshots pinned in the current thread/context
+_pins = ContextLocal('deltaburke.pins', {})
+# NOTE: the pins each entered Pinned replaced, restored (in order) on exit
+_pin_stack = ContextLocal('deltaburke.pin_stack', ())
+_scope = ContextLocal('deltaburke.namespace', None)
+
+
 class FrozenError(Exception):
     pass
 
 
+def _frozen(value):
+    """ Return an immutable version of value (dicts and lists, recursively)
+
+    """
+    if isinstance(value, (Frozen, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        return Frozen((k, _frozen(v)) for k, v in value.iteritems())
+    if isinstance(value, list):
+        return FrozenList(_frozen(v) for v in value)
+    return value
+
+
+def _thawed(value):
+    """ Return a mutable version of value (dicts and lists, recursively)
+
+    """
+    if isinstance(value, dict):
+        return Bunch((k, _thawed(v)) for k, v in value.iteritems())
+    if isinstance(value, (list, FrozenList)):
+        return [_thawed(v) for v in value]
+    return value
+
+
+class FrozenList(tuple):
+    """ Immutable, hashable list
+
+    Compares equal to lists with the same items.
+
+    """
+    def __eq__(self, other):
+        if isinstance(other, list):
+            other = tuple(other)
+        return tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = tuple.__hash__
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, list(self))
+
+
+def _item_attr(self, k):
+    """ __getattr__ reading items directly
+
+    Python only calls __getattr__ once the regular attribute lookup failed.
+    Bunch.__getattr__ repeats that lookup, failing (and raising) again before
+    it reads the item; this reads it right away.
+
+    """
+    try:
+        return dict.__getitem__(self, k)
+    except KeyError:
+        raise AttributeError(k)
+
+
 class Frozen(Bunch):
+    __getattr__ = _item_attr
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+
     def __setattr__(self, k, v):
         raise FrozenError()
 
     def __setitem__(self, k, v):
         raise FrozenError()
 
+    def __delitem__(self, k):
+        raise FrozenError()
+
+    def _immutable(self, *args, **kwargs):
+        raise FrozenError()
+
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __hash__(self):
+        try:
+            return self.__dict__['_hash']
+        except KeyError:
+            hash_ = self.__dict__['_hash'] = hash(frozenset(self.iteritems()))
+            return hash_
+
     def __deepcopy__(self, memo):
-        new = Bunch()
+        new = Clone(self)
         memo[id(self)] = new
-        for k, v in self.iteritems():
-            setattr(new, k, copy.deepcopy(v, memo))
         return new
 
 
+class Clone(Bunch):
+    """ Copy-on-write clone of a frozen node
+
+    Children are shared with the frozen source and only copied into the clone
+    when they are reached through it, so cloning costs a single shallow copy
+    and mutating costs are proportional to what is touched.
+
+    """
+    def __init__(self, *args, **kwargs):
+        super(Clone, self).__init__(*args, **kwargs)
+        self.__dict__['_owned'] = set()
+
+    def __getitem__(self, k):
+        v = super(Clone, self).__getitem__(k)
+        if k not in self._owned:
+            if isinstance(v, dict):
+                v = Clone(v)
+            elif isinstance(v, (list, FrozenList)):
+                v = _thawed(v)
+            self[k] = v
+        return v
+
+    def __setitem__(self, k, v):
+        super(Clone, self).__setitem__(k, v)
+        self._owned.add(k)
+
+    def get(self, k, default=None):
+        if not dict.__contains__(self, k):
+            return default
+        return self[k]
+
+    def setdefault(self, k, default=None):
+        if not dict.__contains__(self, k):
+            self[k] = default
+        return self[k]
+
+    def pop(self, k, *default):
+        if dict.__contains__(self, k):
+            v = self[k]
+            dict.__delitem__(self, k)
+            self._owned.discard(k)
+            return v
+        return super(Clone, self).pop(k, *default)
+
+    def popitem(self):
+        if len(self) == 0:
+            raise KeyError('popitem(): dictionary is empty')
+        k = next(dict.__iter__(self))
+        return k, self.pop(k)
+
+    def __delitem__(self, k):
+        super(Clone, self).__delitem__(k)
+        self._owned.discard(k)
+
+    def itervalues(self):
+        for k in self.keys():
+            yield self[k]
+
+    def iteritems(self):
+        for k in self.keys():
+            yield k, self[k]
+
+    def values(self):
+        return list(self.itervalues())
+
+    def items(self):
+        return list(self.iteritems())
+
+    def copy(self):
+        return Bunch(self.iteritems())
+
+
+def _leaf(value):
+    """ Encode a leaf value for fingerprint()
+
+    """
+    if type(value) is str:
+        return 's%d:%s' % (len(value), value)
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    if isinstance(value, str):
+        return 's%d:%s' % (len(value), value)
+    if value is None or isinstance(value, (bool, int, long)):
+        return 'v%r' % (value)
+    if isinstance(value, float):
+        return 'f%r' % (value)
+    try:
+        return 'j%s' % (json.dumps(value))
+    except (TypeError, ValueError):
+        return 'r%s(%r)' % (type(value).__name__, value)
+
+
+def _child(value):
+    if isinstance(value, (dict, list, tuple)):
+        return 'n%s' % (fingerprint(value))
+    return _leaf(value)
+
+
+def fingerprint(value):
+    """ Content fingerprint (a hex SHA-1 digest) of a config value
+
+    Dicts and lists are fingerprinted as Merkle trees: from their keys and
+    their children's fingerprints. Frozen nodes (and frozen configs) cache
+    their fingerprint once it's computed, and since changes share unchanged
+    nodes with the previous config, only the nodes a change replaced are
+    fingerprinted again. Comparing fingerprints compares (sub)trees in
+    constant time.
+
+    Numbers are fingerprinted by type, so e.g. 1 and 1.0 have different
+    fingerprints although they compare equal.
+
+    """
+    cached = isinstance(value, (Frozen, FrozenList)) or \
+        (isinstance(value, Config) and value._frozen)
+    if cached and '_fingerprint' in value.__dict__:
+        return value.__dict__['_fingerprint']
+    if isinstance(value, dict):
+        digest = 'd%s' % (''.join(['%s\0%s\0' % (_leaf(k), _child(v))
+                                   for k, v in sorted(dict.items(value))]))
+    elif isinstance(value, (list, tuple)):
+        digest = 'l%s' % (''.join(['%s\0' % (_child(v)) for v in value]))
+    else:
+        digest = _leaf(value)
+    digest = hashlib.sha1(digest).hexdigest()
+    if cached:
+        value.__dict__['_fingerprint'] = digest
+    return digest
+
+
+def _overlay(base, overrides):
+    """ Compose overrides on top of a (frozen) base node
+
+    Subtrees of base that are not overridden are shared, not copied.
+
+    """
+    node = dict(base) if isinstance(base, dict) else {}
+    for k, v in overrides.iteritems():
+        if isinstance(v, dict):
+            node[k] = _overlay(node.get(k), v)
+        else:
+            node[k] = _frozen(v)
+    return Frozen(node)
+
+
+# marks a key missing from a layer
+_missing = object()
+
+
+def _merge_into(node, value):
+    for k, v in value.iteritems():
+        if isinstance(v, dict):
+            if not isinstance(node.get(k, None), dict):
+                node[k] = Bunch()
+            _merge_into(node[k], v)
+        else:
+            node[k] = v
+
+
+def _merged(values):
+    """ Merge values in order, later values taking precedence
+
+    Dicts are merged recursively into new Bunches (values are left untouched),
+    anything else replaces what came before it. Values may be _missing.
+
+    """
+    result = _missing
+    for value in values:
+        if isinstance(value, dict):
+            if not isinstance(result, dict):
+                result = Bunch()
+            _merge_into(result, value)
+        elif value is not _missing:
+            result = value
+    return result
+
+
+def _substituted(value, subs):
+    """ Return value with string Template substitutions applied (recursively)
+
+    """
+    if subs is None:
+        return value
+    if isinstance(value, dict):
+        return Bunch((k, _substituted(v, subs)) for k, v in value.iteritems())
+    if isinstance(value, (list, FrozenList)):
+        return [_substituted(v, subs) for v in value]
+    if isinstance(value, basestring):
+        return Template(value).substitute(**subs)
+    return value
+
+
+def _recompose(effective, values, index, old, subs=None):
+    """ Recompose a frozen node after one of the values it merges changed
+
+    :param effective:   the current (frozen) merge of values
+    :param values:      the (dict) values merged into effective, in order
+    :param index:       the index of the value that changed
+    :param old:         the value at index before it changed
+    :param subs:        substitutions to apply to recomputed values
+
+    Only the keys that changed in values[index] are recomputed (descending
+    into dicts that changed on both sides), everything else is shared with
+    effective.
+
+    """
+    new = values[index]
+    node = dict(effective)
+    for k in set(old.iterkeys()) | set(new.iterkeys()):
+        o = old.get(k, _missing)
+        n = new.get(k, _missing)
+        if o is n or o == n:
+            continue
+        children = [value.get(k, _missing) for value in values]
+        last_leaf = -1
+        for i, child in enumerate(children):
+            if child is not _missing and not isinstance(child, dict):
+                last_leaf = i
+        dicts = [i for i in xrange(last_leaf + 1, len(children))
+                 if isinstance(children[i], dict)]
+        if index < last_leaf or \
+           (index == last_leaf and len(dicts) > 0 and
+            o is not _missing and not isinstance(o, dict)):
+            # shadowed by later values
+            continue
+        if isinstance(n, dict) and isinstance(node.get(k, None), dict) and \
+           (o is _missing or isinstance(o, dict)):
+            node[k] = _recompose(node[k], [children[i] for i in dicts],
+                                 dicts.index(index),
+                                 {} if o is _missing else o, subs)
+            continue
+        value = _merged(children)
+        if value is _missing:
+            del node[k]
+        else:
+            node[k] = _frozen(_substituted(value, subs))
+    return Frozen(node)
+
+
+def _unchanged(old, new):
+    """ Whether nodes are the same as (or have the fingerprints of) old nodes
+
+    """
+    for a, b in zip(old, new):
+        if a is b:
+            continue
+        if a is _missing or b is _missing or fingerprint(a) != fingerprint(b):
+            return False
+    return True
+
+
+def _keys(path):
+    """ Split a dotted path into a tuple of keys
+
+    """
+    if isinstance(path, basestring):
+        return tuple(path.split('.'))
+    return tuple(path)
+
+
+def _find(node, keys):
+    """ Return the value at keys (a tuple) under node or _missing
+
+    """
+    for key in keys:
+        if not isinstance(node, dict) or key not in node:
+            return _missing
+        node = dict.__getitem__(node, key)
+    return node
+
+
+def _index(collection, field):
+    """ Map the values of field to the items of collection (first one wins)
+
+    collection is either a dict (its values are indexed, in key order) or a
+    list.
+
+    """
+    if isinstance(collection, dict):
+        items = [collection[k] for k in sorted(collection.keys())]
+    elif isinstance(collection, (list, FrozenList)):
+        items = collection
+    else:
+        items = []
+    index = {}
+    for item in items:
+        value = _find(item, field)
+        if value is not _missing and value not in index:
+            index[value] = item
+    return index
+
+
 class Config(Bunch):
+    __getattr__ = _item_attr
+
     def __init__(self, *args, **kwargs):
         super(Config, self).__init__(*args, **kwargs)
         self.__dict__['_frozen'] = False
+        self.__dict__['_indexes'] = {}
+        self.__dict__['_derived'] = {}
         for item in [k for k in self.keys() if not k.startswith('_')]:
             if isinstance(self[item], dict):
                 self[item] = bunchify(self[item])
@@ -62,7 +447,16 @@ class Config(Bunch):
             raise FrozenError()
         super(Config, self).__setitem__(k, v)
 
+    def __hash__(self):
+        if not self._frozen:
+            raise TypeError('unhashable type: mutable Config')
+        return hash(frozenset(self.iteritems()))
+
     def __deepcopy__(self, memo):
+        if self._frozen:
+            new = Clone(self)
+            memo[id(self)] = new
+            return new
         new = Bunch()
         memo[id(self)] = new
         for k, v in self.iteritems():
@@ -127,38 +521,29 @@ class Config(Bunch):
             Config._walk(other, _merge_node)
 
     def _do_subs(self, sub_key):
-        def __do_subs(node, subs):
-            if isinstance(node, dict):
-                for k in node.keys():
-                    if node == self and k == sub_key:
-                        continue
-                    node[k] = __do_subs(node[k], subs)
-            elif isinstance(node, list):
-                for i in xrange(len(node)):
-                    node[i] = __do_subs(node[i], subs)
-            elif isinstance(node, basestring):
-                node = Template(node).substitute(**subs)
-            return node
-
         if sub_key in self.keys():
             with self._handle():
-                subs = self.pop(sub_key)
-                try:
-                    __do_subs(self, subs)
-                finally:
-                    self[sub_key] = subs
+                subs = self[sub_key]
+                for k in self.keys():
+                    if k != sub_key:
+                        self[k] = _substituted(self[k], subs)
 
     def _freeze(self):
         """ Make Config immutable
 
-        NOTE: embedded lists are still mutable
+        Embedded lists are converted to FrozenLists (and dicts within them to
+        Frozen)
 
         """
         if self._frozen:
             return
         def _freeze_node(keys, val, parent, isleaf):
-            if val is not self and isinstance(val, dict):
+            if val is self or isinstance(val, (Frozen, FrozenList)):
+                return
+            if isinstance(val, dict):
                 parent[keys[-1]] = Frozen(val)
+            elif isinstance(val, list):
+                parent[keys[-1]] = _frozen(val)
         Config._moon_walk(self, _freeze_node)
         self._frozen = True
 
@@ -171,12 +556,109 @@ class Config(Bunch):
         def _thaw_node(keys, val, parent, isleaf):
             if val is not self and isinstance(val, Frozen):
                 parent[keys[-1]] = Bunch(val)
+            elif isinstance(val, FrozenList):
+                parent[keys[-1]] = _thawed(val)
         self.__dict__['_frozen'] = False
+        self.__dict__.pop('_fingerprint', None)
+        self.__dict__['_derived'] = {}
         Config._walk(self, _thaw_node)
 
+    @classmethod
+    def _from_node(cls, node, frozen):
+        """ Build a config holding node's items as they are (no bunchifying)
+
+        """
+        config = cls()
+        dict.update(config, node)
+        config.__dict__['_frozen'] = frozen
+        return config
+
+    @classmethod
+    def _overlay(cls, base, overrides):
+        """ Build a frozen config from overrides layered on a base config
+
+        """
+        return cls._from_node(_overlay(base, overrides), True)
+
+    def _recompose(self, values, index, old, sub_key=None):
+        """ Build a new frozen config after values[index] changed from old
+
+        See _recompose(). A change to the substitutions (sub_key) requires a
+        full rebuild instead.
+
+        """
+        subs = None if sub_key is None else self.get(sub_key, None)
+        return self._from_node(_recompose(self, values, index, old, subs),
+                               True)
+
+    def _reindex(self, specs, previous=None):
+        """ Build indexes, see ConfigManager.add_index
+
+        Indexes of previous are reused for collections that are shared with
+        it, i.e. that did not change.
+
+        :param specs:       (path, field) tuples to index
+        :param previous:    the config this one replaces
+
+        """
+        indexes = {}
+        for spec in specs:
+            path, field = spec
+            collection = _find(self, path)
+            if previous is not None and spec in previous._indexes and \
+               _find(previous, path) is collection:
+                indexes[spec] = previous._indexes[spec]
+            else:
+                indexes[spec] = _index(collection, field)
+        self.__dict__['_indexes'] = indexes
+
+    def _lookup(self, path, field, value, default=None):
+        """ Find the item of an indexed collection with field equal to value
+
+        :param path:    dotted path (or sequence of keys) of the collection
+        :param field:   dotted path (or sequence of keys) of the field within
+                        the collection's items
+
+        """
+        try:
+            index = self._indexes[(_keys(path), _keys(field))]
+        except KeyError:
+            raise ValueError('%s is not indexed by %s' % (path, field))
+        return index.get(value, default)
+
+    def _derive(self, name, paths, func):
+        """ Return func called with the nodes at paths (None where missing)
+
+        Frozen configs cache the value by name. A cached value (which may
+        have been carried over from the config this one replaced, see
+        ConfigManager.derive) is reused as long as the nodes at paths are
+        the same nodes or have the same fingerprints.
+
+        """
+        spec = (tuple(_keys(path) for path in paths), func)
+        nodes = tuple(_find(self, keys) for keys in spec[0])
+        cached = self._derived.get(name, None)
+        if cached is not None and cached[0] == spec and \
+           _unchanged(cached[1], nodes):
+            value = cached[2]
+        else:
+            value = func(*[None if node is _missing else node
+                           for node in nodes])
+        if self._frozen:
+            self._derived[name] = (spec, nodes, value)
+        return value
+
     def mutable_clone(self, node=None, clone=None):
+        """ Return a mutable copy of the config (or a node of it)
+
+        Frozen configs are cloned copy-on-write (see Clone), mutable ones are
+        copied eagerly since they may still change underneath the clone.
+
+        """
         if node is None:
             node = self
+        if self._frozen:
+            return Clone(node)
         if clone is None:
             clone = Bunch()
         for k, v in node.iteritems():
@@ -205,6 +687,8 @@ class Config(Bunch):
 class ConfigManager(object):
     DEFAULT_NAMESPACE = 'default'
 
+    # NOTE: guards the manager's registry (namespace locks, signals and
+    #       settings); each namespace's config is guarded by its own lock
     _lock = threading.RLock()
 
     def __new__(cls, *args, **kwargs):
@@ -219,11 +703,24 @@ class ConfigManager(object):
             self._configs = {}
             self._sub_keys = {}
             self._monitors = {}
+            self._layers = {}
+            self._overlays = {}
+            self._indexes = {}
+            self._derivations = {}
+            self._evicted = {}
+            self._used = {}
+            self._clock = itertools.count()
+            self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+            self._max_namespaces = None
             self._monitor_interval = 60
+            self._snapshots = None
+            self._locks = {}
             self._initialized = True
             self._namespace = self.__class__.DEFAULT_NAMESPACE
             self._signal_namespace = blinker.Namespace()
             self._update_signals = {}
+            self._batch_update_signal = \
+                self._signal_namespace.signal('__deltaburke__')
             self._update_signals[self.__class__.DEFAULT_NAMESPACE] = \
                 self._signal_namespace.signal(
                     self.__class__._update_signal_name(
@@ -235,18 +732,76 @@ class ConfigManager(object):
 
     @property
     def lock(self):
-        return self._lock
+        """ The lock of the current namespace, see namespace()
+
+        """
+        return self._namespace_lock(None)
+
+    def _namespace_lock(self, namespace):
+        namespace = self._get_namespace(namespace)
+        lock = self._locks.get(namespace, None)
+        if lock is None:
+            with self._lock:
+                lock = self._locks.setdefault(namespace, threading.RLock())
+        return lock
+
+    @contextmanager
+    def _namespace_locks(self, namespaces):
+        """ Hold the locks of many namespaces
+
+        Locks are only waited for while none is held (and released again if
+        another one is busy), so this can't deadlock with threads holding any
+        of them.
+
+        """
+        locks = [self._namespace_lock(namespace)
+                 for namespace in sorted(set(namespaces))]
+        first = 0
+        while True:
+            held = []
+            for lock in locks[first:] + locks[:first]:
+                if not lock.acquire(len(held) == 0):
+                    break
+                held.append(lock)
+            if len(held) == len(locks):
+                break
+            for lock in held:
+                lock.release()
+            first = locks.index(lock)
+        try:
+            yield
+        finally:
+            for lock in held:
+                lock.release()
 
     @property
-    @synchronized(_lock)
     def config(self):
-        return self._configs.get(self._namespace, None)
+        return self.get_config()
 
-    @synchronized(_lock)
     def get_config(self, namespace=None):
-        if namespace is None:
-            return self.config
-        return self._configs.get(namespace, None)
+        namespace = self._get_namespace(namespace)
+        pins = _pins.get()
+        if namespace in pins:
+            return pins[namespace]
+        # NOTE: configs are published by replacing them (atomically) and never
+        #       modified, so reading doesn't need a lock
+        config = self._configs.get(namespace, None)
+        if config is None:
+            if namespace in self._evicted:
+                config = self._reload(namespace)
+        elif self._max_namespaces is not None:
+            self._used[namespace] = next(self._clock)
+            self._stats['hits'] += 1
+        return config
+
+    def pinned(self, namespace=None):
+        """ Pin the current config of a namespace for a unit of work
+
+        Usable as a context manager (yielding the pinned config) or as a
+        decorator. See Pinned.
+
+        """
+        return Pinned(self, namespace)
 
     @property
     @synchronized(_lock)
@@ -258,17 +813,308 @@ class ConfigManager(object):
     def monitor_interval(self, interval):
         self._monitor_interval = interval
 
-    def _get_namespace(self, namespace):
-        return self._namespace if namespace is None else namespace
+    @property
+    def max_namespaces(self):
+        """ How many namespaces to keep loaded (or None for all of them)
+
+        Beyond that, the least recently read namespaces are evicted: their
+        config is dropped and their monitors stopped, and the next read
+        loads them again from their sources. Only namespaces whose layers
+        were all loaded from sources (not dictionaries), that are neither
+        overlays nor overlaid and that have no update callbacks are
+        evicted. See namespace_stats.
+
+        """
+        return self._max_namespaces
+
+    @max_namespaces.setter
+    def max_namespaces(self, count):
+        with self._lock:
+            self._max_namespaces = count
+        self._evict_idle()
+
+    @property
+    def namespace_stats(self):
+        """ Counts of reads of loaded namespaces (hits), of evicted ones that
+        were loaded again (misses) and of evictions, and how many namespaces
+        are loaded and evicted. Hits are only counted with max_namespaces
+        set (and not synchronized, so they may undercount).
+
+        """
+        stats = dict(self._stats)
+        stats['loaded'] = len(self._configs)
+        stats['evicted'] = len(self._evicted)
+        return stats
+
+    @property
+    @synchronized(_lock)
+    def snapshot_dir(self):
+        """ Directory of local snapshots of remote sources (or None)
+
+        When set, remote sources (see SnapshotCache.SCHEMES) are loaded from
+        their last known good snapshot if there is one, and refreshed in the
+        background (by their monitor, if monitored). The namespace is updated
+        and signaled only if the source differs from its snapshot.
 
-    def _do_subs(self, namespace):
-        self._configs[namespace]._do_subs(self._sub_keys[namespace])
+        """
+        return None if self._snapshots is None else self._snapshots.directory
 
+    @snapshot_dir.setter
     @synchronized(_lock)
+    def snapshot_dir(self, directory):
+        self._snapshots = None if directory is None else \
+            SnapshotCache(directory)
+
+    def _get_namespace(self, namespace):
+        if namespace is None:
+            namespace = _scope.get()
+            if namespace is None:
+                return self._namespace
+        return namespace
+
+    def _build(self, namespace):
+        """ Compose a namespace's config from all of its layers
+
+        """
+        if namespace in self._overlays:
+            self._compose(namespace)
+            return
+        self._publish(namespace, self._built(self._layers[namespace],
+                                             self._sub_keys[namespace]))
+
+    @staticmethod
+    def _built(layers, sub_key):
+        config = _merged(layer.data for layer in layers)
+        config = Config._from_node(Config() if config is _missing else config,
+                                   False)
+        config._do_subs(sub_key)
+        config._freeze()
+        return config
+
+    def _rebuild(self, namespace, index, old, do_subs=True):
+        """ Recompose a namespace's config after one of its layers changed
+
+        Only the keys affected by the change are recomputed, with the
+        precedence of the other layers preserved.
+
+        """
+        if namespace in self._overlays:
+            self._compose(namespace)
+            return
+        layers = self._layers[namespace]
+        sub_key = self._sub_keys[namespace]
+        if sub_key is not None and \
+           old.get(sub_key, None) != layers[index].data.get(sub_key, None):
+            self._build(namespace)
+            return
+        self._publish(namespace, self._configs[namespace]._recompose(
+            [layer.data for layer in layers], index, old,
+            sub_key if do_subs else None))
+
+    def _compose(self, namespace):
+        """ Compose an overlay's config from its parent's and its overrides
+
+        The overrides are substituted like the parent's config was (see
+        load's sub_key), with the parent's substitutions updated by the
+        overrides' own. If that changes any substitution, the parent's
+        strings have to be substituted again too, so the config is built
+        from all the layers of the overlay and its ancestors instead.
+
+        """
+        parent = self._configs.get(self._overlays[namespace], None)
+        overrides = _merged(layer.data for layer in self._layers[namespace])
+        overrides = {} if overrides is _missing else overrides
+        lineage = [namespace]
+        while lineage[-1] in self._overlays:
+            lineage.append(self._overlays[lineage[-1]])
+        sub_key = self._sub_keys.get(lineage[-1], None)
+        if sub_key is not None:
+            inherited = {}
+            if parent is not None:
+                inherited.update(parent.get(sub_key, None) or {})
+            subs = dict(inherited)
+            subs.update(overrides.get(sub_key, None) or {})
+            if subs != inherited:
+                self._publish(namespace, self._built(
+                    [layer for ancestor in reversed(lineage)
+                     for layer in self._layers.get(ancestor, [])], sub_key))
+                return
+            overrides = dict((k, v if k == sub_key else _substituted(v, subs))
+                             for k, v in overrides.iteritems())
+        self._publish(namespace, Config._overlay(parent, overrides))
+
+    def _publish(self, namespace, config):
+        """ Make a new (frozen) config the namespace's current one
+
+        """
+        previous = self._configs.get(namespace, None)
+        config._reindex(self._indexes.get(namespace, ()), previous)
+        if previous is not None:
+            config._derived.update(previous._derived)
+        else:
+            self._used.setdefault(namespace, next(self._clock))
+        self._configs[namespace] = config
+
+    def _materialized(self, namespace):
+        """ The namespace's config, loaded again if it was evicted
+
+        """
+        config = self._configs.get(namespace, None)
+        if config is None and namespace in self._evicted:
+            config = self._reload(namespace)
+        return config
+
+    def _reload(self, namespace):
+        """ Load an evicted namespace from its sources (and monitor them)
+
+        """
+        with self._namespace_lock(namespace):
+            evicted = self._evicted.get(namespace, None)
+            if namespace in self._configs or evicted is None:
+                return self._configs.get(namespace, None)
+            self.load(evicted.srcs, False, namespace, sub_key=evicted.sub_key)
+            for layer in self._layers[namespace]:
+                if layer.src in evicted.monitors:
+                    self.start_src_monitor(layer.src,
+                                           evicted.monitors[layer.src],
+                                           namespace, layer.data)
+            self._used[namespace] = next(self._clock)
+            self._stats['misses'] += 1
+            return self._configs[namespace]
+
+    def _evict_idle(self, keep=None):
+        """ Evict the least recently read namespaces beyond max_namespaces
+
+        Namespaces that are busy (locked by another thread) are skipped.
+
+        :param keep:    a namespace not to evict
+
+        """
+        if self._max_namespaces is None:
+            return
+        excess = len(self._configs) - self._max_namespaces
+        used = self._used
+        for namespace in sorted(self._configs.keys(),
+                                key=lambda namespace: used.get(namespace, -1)):
+            if excess <= 0:
+                break
+            if namespace != keep and self._evict(namespace):
+                excess -= 1
+
+    def _evict(self, namespace):
+        """ Drop a namespace's config, recording how to load it again
+
+        :returns: whether the namespace was evicted
+
+        """
+        lock = self._namespace_lock(namespace)
+        if not lock.acquire(False):
+            return False
+        try:
+            layers = self._layers.get(namespace, None)
+            signal = self._update_signals.get(namespace, None)
+            if namespace not in self._configs or layers is None or \
+               namespace in self._overlays or \
+               namespace in self._overlays.values() or \
+               any(layer.src is None for layer in layers) or \
+               (signal is not None and bool(signal.receivers)):
+                return False
+            monitors = self._monitors.pop(namespace, {})
+            self._evicted[namespace] = Bunch(
+                srcs=[layer.src for layer in layers],
+                sub_key=self._sub_keys.pop(namespace, None),
+                monitors=dict((src, monitor.poll_interval)
+                              for src, monitor in monitors.iteritems()))
+            del self._configs[namespace]
+            del self._layers[namespace]
+            self._used.pop(namespace, None)
+            self._stats['evictions'] += 1
+        finally:
+            lock.release()
+        # NOTE: monitors take the lock to update, so stop them without it
+        for monitor in monitors.itervalues():
+            monitor.stop()
+        return True
+
+    def _update_overlays(self, parent, signal_update):
+        """ Recompose the overlays of parent (recursively)
+
+        :returns: the namespaces that were recomposed
+
+        """
+        updated = []
+        for namespace, overlay_parent in self._overlays.items():
+            if overlay_parent == parent:
+                with self._namespace_lock(namespace):
+                    self._compose(namespace)
+                    if signal_update:
+                        self.signal_update(namespace)
+                    updated.append(namespace)
+                    updated.extend(self._update_overlays(namespace,
+                                                         signal_update))
+        return updated
+
+    def _load_layer(self, config, namespace, monitor):
+        """ Load a layer from a config source
+
+        A remote source with a snapshot is loaded from it; the layer is then
+        marked stale, see _refresh_stale().
+
+        """
+        src = None
+        stale = False
+        if isinstance(config, basestring):
+            src = config
+            snapshots = self._snapshots
+            covered = snapshots is not None and snapshots.covers(src)
+            config = snapshots.get(src) if covered else None
+            if config is not None:
+                stale = True
+            else:
+                config = Loader.load(src)
+                if covered:
+                    snapshots.put(src, config)
+            if monitor:
+                # NOTE: the monitor's first poll refreshes a stale layer
+                self.start_src_monitor(src, namespace=namespace, data=config)
+                stale = False
+        return Bunch(src=src, data=_frozen(config), stale=stale)
+
+    def _refresh_stale(self, namespace, layers):
+        """ Refresh layers loaded from snapshots in the background
+
+        """
+        for layer in layers:
+            if layer.get('stale', False):
+                thread = threading.Thread(target=self._refresh,
+                                          args=(namespace, layer))
+                thread.daemon = True
+                thread.start()
+
+    def _refresh(self, namespace, layer):
+        try:
+            data = Loader.load(layer.src)
+        except Exception:
+            traceback.print_exc()
+            return
+        with self._namespace_lock(namespace):
+            # NOTE: skip layers that were replaced in the meantime
+            if not any(current is layer
+                       for current in self._layers.get(namespace, ())):
+                return
+            if _frozen(data) == layer.data:
+                layer.stale = False
+                return
+            self.update_src(layer.src, data, True, namespace)
+
     def load(self, config_src, signal_update=True, namespace=None,
                    monitor=False, sub_key=None):
         """ Load config from source(s)
 
+        Each source is kept as a layer of the namespace's config, so that when
+        a monitored source changes only its layer is replaced (see
+        update_src).
+
         :param config_src:  URI(s) or dictionaries to load the config from. If
                             config_src is a list, then the first config is
                             loaded as the main config with subsequent configs
@@ -278,27 +1124,135 @@ class ConfigManager(object):
 
         """
         namespace = self._get_namespace(namespace)
-        merge_configs = []
-        if isinstance(config_src, list):
-            merge_configs = config_src[1:]
-            config_src = config_src[0]
-        if isinstance(config_src, basestring):
-            if monitor:
-                self.start_src_monitor(config_src)
-            config_src = Loader.load(config_src)
-        self._configs[namespace] = Config(bunchify(config_src))
-        self.merge(merge_configs, False, namespace, monitor, False)
-        self._sub_keys[namespace] = sub_key
-        self._do_subs(namespace)
-        self._configs[namespace]._freeze()
-        if signal_update:
-            self.signal_update(namespace)
+        with self._namespace_lock(namespace):
+            if not isinstance(config_src, list):
+                config_src = [config_src]
+            layers = [self._load_layer(config, namespace, monitor)
+                      for config in config_src]
+            self._overlays.pop(namespace, None)
+            self._layers[namespace] = layers
+            self._sub_keys[namespace] = sub_key
+            self._build(namespace)
+            self._evicted.pop(namespace, None)
+            if signal_update:
+                self.signal_update(namespace)
+            self._update_overlays(namespace, signal_update)
+            self._refresh_stale(namespace, layers)
+        self._evict_idle(namespace)
+
+    def load_many(self, config_srcs, signal_update=True, monitor=False,
+                        sub_key=None, threads=8):
+        """ Load many namespaces at once
+
+        Sources are loaded and configs built concurrently without holding the
+        lock, then all namespaces are committed at once. Nothing is committed
+        if any namespace fails to load.
+
+        Instead of a signal per namespace, a single batch update (see
+        register_batch_update_callback) lists the namespaces whose config
+        changed, including their overlays. Only those namespaces that have
+        callbacks registered are signaled individually.
+
+        :param config_srcs: config source(s) (see load) by namespace
+        :type config_srcs:  a dictionary
+        :param threads:     how many namespaces to prepare concurrently
+        :type threads:      an int
+        :returns:           the namespaces whose config changed
+
+        """
+        def prepare(item):
+            namespace, config_src = item
+            if not isinstance(config_src, list):
+                config_src = [config_src]
+            previous = self._configs.get(namespace, None)
+            layers = [self._load_layer(config, namespace, False)
+                      for config in config_src]
+            config = self._built(layers, sub_key)
+            return namespace, config_src, layers, config, previous, \
+                   config != previous
+
+        items = config_srcs.items()
+        pool = ThreadPool(max(1, min(threads, len(items))))
+        try:
+            prepared = pool.map(prepare, items)
+        finally:
+            pool.close()
+        changed = []
+        with self._namespace_locks(config_srcs.keys()):
+            for namespace, config_src, layers, config, previous, differs \
+                    in prepared:
+                if differs or previous is not self._configs.get(namespace,
+                                                                None):
+                    changed.append(namespace)
+                self._overlays.pop(namespace, None)
+                self._layers[namespace] = layers
+                self._sub_keys[namespace] = sub_key
+                self._publish(namespace, config)
+                self._evicted.pop(namespace, None)
+            for namespace in list(changed):
+                changed.extend(self._update_overlays(namespace, False))
+            for namespace, _, layers, _, _, _ in prepared:
+                if monitor:
+                    for layer in layers:
+                        if layer.src is not None:
+                            self.start_src_monitor(layer.src,
+                                                   namespace=namespace,
+                                                   data=layer.data)
+                            layer.stale = False
+                self._refresh_stale(namespace, layers)
+            changed = sorted(set(changed))
+            if signal_update and len(changed) > 0:
+                for namespace in changed:
+                    signal = self._update_signals.get(namespace, None)
+                    if signal is not None and bool(signal.receivers):
+                        self.signal_update(namespace)
+                self._batch_update_signal.send(changed)
+        self._evict_idle()
+        return changed
+
+    def overlay(self, parent, config_src=None, signal_update=True,
+                      namespace=None, monitor=False):
+        """ Layer a namespace on top of another namespace
+
+        Only the overrides are stored; everything else is shared with the
+        parent namespace's config. When the parent is updated the overlay is
+        recomposed (and signaled if the parent was).
+
+        :param parent:      the namespace to layer on top of
+        :type parent:       a string
+        :param config_src:  URI(s) or dictionaries to load the overrides from
+        :type config_src:   a string or dictionary or list of strings and/or
+                            dictionaries
+
+        """
+        namespace = self._get_namespace(namespace)
+        ancestor = parent
+        while ancestor is not None:
+            if ancestor == namespace:
+                raise ValueError('namespace %s can not overlay itself' %
+                                 (namespace))
+            ancestor = self._overlays.get(ancestor, None)
+        # NOTE: the parent's lock is taken first, as when it's updated
+        with self._namespace_lock(parent):
+            self._materialized(parent)
+            with self._namespace_lock(namespace):
+                self._evicted.pop(namespace, None)
+                self._overlays[namespace] = parent
+                self._layers[namespace] = []
+                self._sub_keys[namespace] = None
+                self._compose(namespace)
+                self.merge([] if config_src is None else config_src,
+                           signal_update, namespace, monitor)
 
-    @synchronized(_lock)
     def merge(self, config_src, signal_update=False, namespace=None,
                     monitor=False, do_subs=True):
         """ Merge configs
 
+        Each source (URI) is added as a new (top) layer of the namespace's
+        config, so update_src can replace it. Dictionaries can't be replaced,
+        so they're folded into the top layer if it's a dictionary too rather
+        than piling up layers that every later change has to merge again.
+
         :param config_src:  URI(s) or dictionaries to load config(s) from to
                             be merged into the main config
         :type config_src:   a string or dictionary or list of strings and/or
@@ -306,57 +1260,197 @@ class ConfigManager(object):
 
         """
         namespace = self._get_namespace(namespace)
-        if self._configs.get(namespace, None) is None:
-            raise ValueError('no config to merge with!')
-        if not isinstance(config_src, list):
-            config_src = [config_src]
-        for config in config_src:
-            if isinstance(config, basestring):
-                if monitor:
-                    self.start_src_monitor(config)
-                config = Loader.load(config)
-            self._configs[namespace]._merge(bunchify(config))
-            if do_subs:
-                self._do_subs(namespace)
-        if signal_update:
-            self.signal_update(namespace)
+        with self._namespace_lock(namespace):
+            if self._materialized(namespace) is None:
+                raise ValueError('no config to merge with!')
+            if not isinstance(config_src, list):
+                config_src = [config_src]
+            layers = self._layers[namespace]
+            added = []
+            for config in config_src:
+                layer = self._load_layer(config, namespace, monitor)
+                if layer.src is None and len(layers) > 0 and \
+                   layers[-1].src is None and \
+                   isinstance(layer.data, dict) and \
+                   isinstance(layers[-1].data, dict):
+                    old = layers[-1].data
+                    layers[-1] = Bunch(src=None,
+                                       data=_overlay(old, layer.data),
+                                       stale=False)
+                else:
+                    old = {}
+                    layers.append(layer)
+                    added.append(layer)
+                self._rebuild(namespace, len(layers) - 1, old, do_subs)
+            if signal_update:
+                self.signal_update(namespace)
+            self._update_overlays(namespace, signal_update)
+            self._refresh_stale(namespace, added)
+
+    def update_src(self, src, data, signal_update=True, namespace=None):
+        """ Replace the layer(s) loaded from a source with new data
+
+        This is what source monitors call when a source changes. Only the
+        keys affected by the change are recomputed; the other sources are not
+        reloaded and keep their precedence. If src is not one of the
+        namespace's layers, data is merged on top of the config.
+
+        :param src:     the URI the data was loaded from
+        :type src:      a string
+        :param data:    the source's new config
+        :type data:     a dictionary
 
-    @synchronized(_lock)
-    def delete(self, namespace=None):
+        """
+        namespace = self._get_namespace(namespace)
+        with self._namespace_lock(namespace):
+            if self._materialized(namespace) is None:
+                raise ValueError('no config to update!')
+            if self._snapshots is not None and self._snapshots.covers(src):
+                self._snapshots.put(src, data)
+            data = _frozen(data)
+            layers = self._layers[namespace]
+            indexes = [i for i, layer in enumerate(layers)
+                       if layer.src == src]
+            if len(indexes) == 0:
+                layers.append(Bunch(src=src, data={}))
+                indexes.append(len(layers) - 1)
+            for index in indexes:
+                old = layers[index].data
+                layers[index] = Bunch(src=src, data=data)
+                self._rebuild(namespace, index, old)
+            if signal_update:
+                self.signal_update(namespace)
+            self._update_overlays(namespace, signal_update)
+
+    def add_index(self, path, field, namespace=None):
+        """ Index a collection of a namespace's config by a field
+
+        Indexes are built whenever the namespace's config changes (reusing
+        the index of a collection that did not change) and queried with
+        lookup() in constant time.
+
+        :param path:    dotted path (or sequence of keys) of the collection, a
+                        dict (whose values are indexed) or a list
+        :param field:   dotted path (or sequence of keys) of the field within
+                        the collection's items to index by
+
+        """
+        namespace = self._get_namespace(namespace)
+        with self._namespace_lock(namespace):
+            specs = self._indexes.setdefault(namespace, set())
+            specs.add((_keys(path), _keys(field)))
+            config = self._configs.get(namespace, None)
+            if config is not None:
+                config._reindex(specs, config)
+
+    def lookup(self, path, field, value, default=None, namespace=None):
+        """ Find an item of an indexed collection by field value
+
+        See add_index() and Config._lookup()
+
+        """
+        config = self.get_config(namespace)
+        if config is None:
+            raise ValueError('no config to look up!')
+        return config._lookup(path, field, value, default)
+
+    def derive(self, name, paths, func, namespace=None):
+        """ Register a value derived from a namespace's config
+
+        The value is func called with the nodes at paths (None where there is
+        no node), computed when derived() first asks for it and cached along
+        with the config. Cached values are carried over to the configs that
+        replace it and only computed again once a node at one of paths
+        changes, so expensive objects built from config (compiled patterns,
+        routing tables, ...) are not rebuilt on every update.
+
+        :param name:    the name to get the value by with derived()
+        :param paths:   dotted paths (or sequences of keys) of func's inputs
+
+        """
+        namespace = self._get_namespace(namespace)
+        with self._namespace_lock(namespace):
+            self._derivations.setdefault(namespace, {})[name] = \
+                (tuple(_keys(path) for path in paths), func)
+
+    def derived(self, name, namespace=None):
+        """ The current value derived by name, see derive()
+
+        Pins are honored, i.e. the value is derived from the pinned config.
+
+        """
         namespace = self._get_namespace(namespace)
         try:
-            del self._configs[namespace]
-        except KeyError:
-            pass
-        try:
-            for src in self._monitors[namespace].keys():
-                self.stop_src_monitor(src)
-                del self._monitors[namespace][src]
-        except KeyError:
-            pass
-        try:
-            del self._sub_keys[namespace]
+            paths, func = self._derivations[namespace][name]
         except KeyError:
-            pass
+            raise ValueError('%s is not derived' % (name))
+        config = self.get_config(namespace)
+        if config is None:
+            raise ValueError('no config to derive %s from!' % (name))
+        return config._derive(name, paths, func)
 
-    @synchronized(_lock)
-    def start_src_monitor(self, src, interval=None, namespace=None):
+    def fingerprint(self, path=None, namespace=None):
+        """ Fingerprint of a namespace's config or a node of it
+
+        See fingerprint()
+
+        :param path:    dotted path (or sequence of keys) of the node
+        :returns:       the fingerprint or None if there is no node at path
+
+        """
+        config = self.get_config(namespace)
+        if config is None:
+            return None
+        node = config if path is None else _find(config, _keys(path))
+        return None if node is _missing else fingerprint(node)
+
+    def delete(self, namespace=None):
+        namespace = self._get_namespace(namespace)
+        with self._namespace_lock(namespace):
+            try:
+                del self._configs[namespace]
+            except KeyError:
+                pass
+            monitors = self._monitors.pop(namespace, {})
+            try:
+                del self._sub_keys[namespace]
+            except KeyError:
+                pass
+            self._layers.pop(namespace, None)
+            self._overlays.pop(namespace, None)
+            self._indexes.pop(namespace, None)
+            self._derivations.pop(namespace, None)
+            self._evicted.pop(namespace, None)
+            self._used.pop(namespace, None)
+            # NOTE: overlays of the namespace are left with their overrides
+            self._update_overlays(namespace, True)
+        # NOTE: monitors take the lock to update, so stop them without it
+        for monitor in monitors.itervalues():
+            monitor.stop()
+
+    def start_src_monitor(self, src, interval=None, namespace=None,
+                                data=None):
         """ Monitor config sources for changes in a separate thread
 
         If a change occurs, then update the config and signal a change to those
         listening
+
+        :param data:    the source's config as currently loaded (loaded from
+                        the source if None)
         """
         namespace = self._get_namespace(namespace)
-        interval = self._monitor_interval if interval is None else interval
-        if namespace not in self._monitors:
-            self._monitors[namespace] = {}
-        if src not in self._monitors[namespace]:
-            data = Loader.load(src)
-            self._monitors[namespace][src] = \
-                    SourceMonitor.monitor(self, src, data, namespace, interval)
-            self._monitors[namespace][src].start()
+        with self._namespace_lock(namespace):
+            if interval is None:
+                interval = self._monitor_interval
+            if namespace not in self._monitors:
+                self._monitors[namespace] = {}
+            if src not in self._monitors[namespace]:
+                if data is None:
+                    data = Loader.load(src)
+                self._monitors[namespace][src] = SourceMonitor.monitor(
+                    self, src, data, namespace, interval)
+                self._monitors[namespace][src].start()
 
-    @synchronized(_lock)
     def stop_src_monitor(self, src, namespace=None):
         """ Monitor config sources for changes in a separate thread
 
@@ -364,13 +1458,15 @@ class ConfigManager(object):
         listening
         """
         namespace = self._get_namespace(namespace)
-        try:
-            self._monitors[namespace][src].stop()
-            del self._monitors[namespace][src]
-            if len(self._monitors[namespace].keys()) == 0:
-                del self._monitors[namespace]
-        except KeyError:
-            pass
+        with self._namespace_lock(namespace):
+            try:
+                monitor = self._monitors[namespace].pop(src)
+                if len(self._monitors[namespace].keys()) == 0:
+                    del self._monitors[namespace]
+            except KeyError:
+                return
+        # NOTE: monitors take the lock to update, so stop them without it
+        monitor.stop()
 
     @synchronized(_lock)
     def register_update_callback(self, callback, namespace=None):
@@ -407,39 +1503,146 @@ class ConfigManager(object):
             del self._update_signals[namespace]
 
     @synchronized(_lock)
+    def register_batch_update_callback(self, callback):
+        """ Register callback for batch updates (see load_many)
+
+        :param callback: a function or method to be called with the list of
+                         namespaces updated by a batch
+        :type callback:  a function or method
+
+        """
+        self._batch_update_signal.connect(callback)
+
+    @synchronized(_lock)
+    def unregister_batch_update_callback(self, callback):
+        self._batch_update_signal.disconnect(callback)
+
     def signal_update(self, namespace=None):
         namespace = self._get_namespace(namespace)
-        if namespace not in self._update_signals:
+        signal = self._update_signals.get(namespace, None)
+        if signal is None:
             return
-        self._update_signals[namespace].send(self._configs[namespace])
+        with self._namespace_lock(namespace):
+            signal.send(self._configs[namespace])
 
     @contextmanager
-    @synchronized(_lock)
     def namespace(self, namespace):
-        previous_namespace = self._namespace
-        self._namespace = namespace
+        """ Use namespace by default within a block
+
+        The scope is local to the current thread (or context, where
+        contextvars are available), so other threads and tasks keep using
+        their own default namespace.
+
+        """
+        previous = _scope.set(namespace)
         try:
             yield
         finally:
-            self._namespace = previous_namespace
+            _scope.set(previous)
 
 
-class CurrentConfigAttr(object):
-    _lock = threading.RLock()
+class Pinned(object):
+    """ Pin the current config of a namespace for a unit of work
 
-    def __init__(self, namespace=None):
+    While pinned, every read of the namespace's config through ConfigManager
+    or CurrentConfigAttr in the same thread (or context, where contextvars
+    are available) returns the same snapshot without taking a lock, even if
+    the config is reloaded in the meantime. Nested pins of a namespace keep
+    the outermost snapshot.
+
+    A Pinned keeps no state of its own, so the same one can be entered again
+    (nested or by other threads) while it's in use.
+
+    """
+    def __init__(self, manager, namespace=None):
+        self._manager = manager
         self._namespace = namespace
-        self._config = ConfigManager().get_config(self._namespace)
-        ConfigManager().register_update_callback(self._update_config,
-                                                 self._namespace)
 
-    @synchronized(_lock)
-    def _update_config(self, config):
-        self._config = config
+    def __enter__(self):
+        namespace = self._manager._get_namespace(self._namespace)
+        pins = _pins.get()
+        _pin_stack.set(_pin_stack.get() + (pins,))
+        if namespace in pins:
+            return pins[namespace]
+        config = self._manager.get_config(namespace)
+        new_pins = dict(pins)
+        new_pins[namespace] = config
+        _pins.set(new_pins)
+        return config
+
+    def __exit__(self, *exc_info):
+        stack = _pin_stack.get()
+        _pins.set(stack[-1])
+        _pin_stack.set(stack[:-1])
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self:
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class CurrentConfigAttr(object):
+    def __init__(self, namespace=None):
+        self._namespace = ConfigManager()._get_namespace(namespace)
 
-    @synchronized(_lock)
     def __get__(self, obj, type=None):
-        return self._config
+        # NOTE: merges replace rather than modify the published config, so
+        #       always read the latest one (this honors pins too)
+        return ConfigManager().get_config(self._namespace)
+
 
+class ConfigPathAttr(object):
+    """ Descriptor for the value at a path of a namespace's current config
 
+    The value (converted by converter, if given) is cached along with the
+    config and node it was resolved from. Since updates publish new configs
+    that share unchanged nodes with the previous one, the value is only
+    resolved and converted again when the node at the path is replaced; reads
+    between updates cost a dictionary lookup and an identity check, without
+    taking the manager's lock. Pins are honored.
 
+        class Server(object):
+            port = ConfigPathAttr('server.port', int, default=8080)
+
+    :param path:        dotted path (or sequence of keys) within the config
+    :param converter:   called with the node at path, its result is returned
+    :param default:     returned (unconverted) if there is no node at path
+
+    """
+    def __init__(self, path, converter=None, namespace=None, default=None):
+        self._keys = _keys(path)
+        self._converter = converter
+        self._namespace = ConfigManager()._get_namespace(namespace)
+        self._default = default
+        # NOTE: (config, node, value), replaced as a whole
+        self._cache = None
+
+    def __get__(self, obj, type=None):
+        pins = _pins.get()
+        if self._namespace in pins:
+            config = pins[self._namespace]
+        else:
+            # NOTE: configs are published by replacing them (atomically) and
+            #       never modified, so reading without the lock is safe
+            manager = ConfigManager()
+            config = manager._configs.get(self._namespace, None)
+            if config is None or manager._max_namespaces is not None:
+                # NOTE: evicted namespaces are loaded again (and reads are
+                #       recorded) by get_config
+                config = manager.get_config(self._namespace)
+        cache = self._cache
+        if cache is not None and cache[0] is config:
+            return cache[2]
+        node = _missing if config is None else _find(config, self._keys)
+        if cache is not None and cache[1] is node:
+            value = cache[2]
+        elif node is _missing:
+            value = self._default
+        elif self._converter is not None:
+            value = self._converter(node)
+        else:
+            value = node
+        self._cache = (config, node, value)
+        return value
@@ -1,4 +1,6 @@
 from abc import ABCMeta, abstractmethod
+from importlib import import_module
+from urllib import unquote
 from urlparse import urlparse
 
 
@@ -9,28 +11,116 @@ class ConfigNotFoundError(Exception):
 
 
 class Loader(object):
+    """ Base config loader class
+
+    Loaders are looked up by the scheme of the URI they load. Built in loaders
+    (and any registered with register_lazy_scheme) are only imported the first
+    time their scheme is used, so e.g. pymongo is never imported by processes
+    that only load files. Third party loaders can be registered through the
+    'deltaburke.loaders' entry point group, named by scheme:
+
+        entry_points={'deltaburke.loaders': ['s3 = mypkg.s3:S3Loader']}
+
+    A URI's fragment can select a subtree of the config with a JSON pointer
+    (RFC 6901), e.g. file:///etc/shared.yml#/services/web loads the web
+    subtree only. Loaders that set PROJECTS select the subtree themselves
+    (see pointer()) so that as little as possible of the rest is fetched or
+    parsed, the subtree of any other loader's config is selected by load().
+    """
     __metaclass__ = ABCMeta
 
+    ENTRY_POINT_GROUP = 'deltaburke.loaders'
+    PROJECTS = False
+
     _schemes = {}
+    _lazy_schemes = {'dir': 'deltaburke.loader.directory:DirectoryLoader',
+                     'file': 'deltaburke.loader.file:FileLoader',
+                     'http': 'deltaburke.loader.http:HttpLoader',
+                     'https': 'deltaburke.loader.http:HttpLoader',
+                     'mongodb': 'deltaburke.loader.mongo:MongoLoader'}
 
     @classmethod
     def register_scheme(cls, scheme, klass):
         cls._schemes[scheme] = klass
 
+    @classmethod
+    def register_lazy_scheme(cls, scheme, path):
+        """ Register a loader to be imported the first time scheme is used
+
+        :param path: the loader's module and class (e.g. 'mypkg.s3:S3Loader')
+
+        """
+        cls._lazy_schemes[scheme] = path
+
+    @staticmethod
+    def _entry_point(scheme):
+        try:
+            import pkg_resources
+        except ImportError:
+            return None
+        for entry_point in pkg_resources.iter_entry_points(
+                Loader.ENTRY_POINT_GROUP, scheme):
+            return '%s:%s' % (entry_point.module_name,
+                              '.'.join(entry_point.attrs))
+        return None
+
+    @classmethod
+    def loader_for(cls, scheme):
+        loader = cls._schemes.get(scheme, None)
+        if loader is None:
+            path = cls._lazy_schemes.get(scheme, None) or \
+                cls._entry_point(scheme)
+            if path is None:
+                raise ValueError('no loader registered for scheme "%s"' %
+                                 (scheme))
+            module, name = path.split(':')
+            loader = getattr(import_module(module), name)
+            cls.register_scheme(scheme, loader)
+        return loader
+
     @staticmethod
     @abstractmethod
     def _load(cls, parsed_url):
         pass
 
+    @staticmethod
+    def pointer(parts):
+        """ The keys of the JSON pointer in parts' (percent-encoded) fragment
+
+        As in RFC 6901, an empty pointer is the whole config and "/" is the
+        key "".
+
+        """
+        fragment = unquote(parts.fragment)
+        if fragment == '':
+            return ()
+        if not fragment.startswith('/'):
+            raise ValueError('invalid JSON pointer %s' % (fragment))
+        return tuple(key.replace('~1', '/').replace('~0', '~')
+                     for key in fragment[1:].split('/'))
+
+    @staticmethod
+    def project(config, parts):
+        """ Select the subtree of config that parts' fragment points to
+
+        """
+        for key in Loader.pointer(parts):
+            if isinstance(config, list) and key.isdigit() and \
+               int(key) < len(config):
+                config = config[int(key)]
+            elif isinstance(config, dict) and key in config:
+                config = config[key]
+            else:
+                raise ConfigNotFoundError(parts.geturl())
+        if not isinstance(config, dict):
+            raise ValueError('%s is not a config' % (parts.geturl()))
+        return config
+
     @classmethod
     def load(cls, src):
         parts = urlparse(src)
-        loader = cls._schemes.get(parts.scheme, None)
-        if loader is None:
-            raise ValueError('no loader registered for scheme "%s"' %
-                             (parts.scheme))
-        return loader._load(parts)
-
-from .file import FileLoader
-from .mongo import MongoLoader
-
+        loader = cls.loader_for(parts.scheme)
+        config = loader._load(parts)
+        if not loader.PROJECTS and parts.fragment:
+            config = cls.project(config, parts)
+        return config
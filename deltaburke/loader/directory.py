@@ -0,0 +1,118 @@
+import os
+import threading
+
+from . import ConfigNotFoundError, Loader
+from .file import FileLoader
+
+
+def _merge(config, other):
+    """ Merge other into config, copying dicts so other is left untouched
+
+    """
+    for k, v in other.iteritems():
+        if isinstance(v, dict):
+            if not isinstance(config.get(k, None), dict):
+                config[k] = {}
+            _merge(config[k], v)
+        else:
+            config[k] = v
+    return config
+
+
+class DirectoryLoader(Loader):
+    """ Directory (conf.d style) config loader class
+
+    Loads every (possibly compressed, see FileLoader) JSON/YAML fragment in a
+    directory (not recursively) and merges them in sorted order, later
+    fragments overriding earlier ones.
+
+        dir:///etc/myapp/conf.d
+
+    Parsed fragments are cached and validated by their stat, so reloading a
+    directory only re-parses the fragments that changed. Empty fragments are
+    skipped.
+
+    NOTE: configs returned for unchanged directories are the cached objects,
+          they must not be modified.
+    """
+    EXTENSIONS = tuple('%s%s' % (extension, suffix)
+                       for extension in ('.json', '.yml', '.yaml')
+                       for suffix in [''] + sorted(FileLoader.COMPRESSIONS))
+    PROJECTS = True
+
+    _lock = threading.Lock()
+    _fragments = {}
+    _configs = {}
+
+    @classmethod
+    def _load(cls, parts):
+        key = parts.geturl()
+        config, _, state = cls.fetch(parts, cls._configs.get(key, None))
+        cls._configs[key] = state
+        return config
+
+    @classmethod
+    def _fragment(cls, path):
+        """ :returns: a (stat, config) tuple or None if path is gone
+
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        stat = (stat.st_ino, stat.st_size, stat.st_mtime)
+        fragment = cls._fragments.get(path, None)
+        if fragment is None or fragment[0] != stat:
+            try:
+                config = FileLoader._open(path)
+            except IOError:
+                return None
+            try:
+                fragment = cls._fragments[path] = \
+                    (stat, FileLoader._parse(path, config))
+            finally:
+                config.close()
+        return fragment
+
+    @classmethod
+    def fetch(cls, parts, state=None):
+        """ Load a directory, re-parsing only changed fragments
+
+        :param state:   the state returned by the caller's previous fetch of
+                        the same URI (or None)
+        :returns:       a (config, modified, state) tuple where modified is
+                        False if no fragment was added, removed or changed
+                        since the previous fetch
+
+        """
+        try:
+            names = sorted(name for name in os.listdir(parts.path)
+                           if name.endswith(cls.EXTENSIONS))
+        except OSError:
+            raise ConfigNotFoundError('dir://%s' % (parts.path))
+        with cls._lock:
+            fragments = []
+            for name in names:
+                path = os.path.join(parts.path, name)
+                fragment = cls._fragment(path)
+                if fragment is not None:
+                    fragments.append((path, fragment))
+            key = [(path, fragment[0]) for path, fragment in fragments]
+            if state is not None and state[0] == key:
+                return state[1], False, state
+            paths = dict(key)
+            for path in cls._fragments.keys():
+                if os.path.dirname(path) == parts.path and path not in paths:
+                    del cls._fragments[path]
+            config = {}
+            for path, fragment in fragments:
+                if fragment[1] is None:
+                    continue
+                if not isinstance(fragment[1], dict):
+                    raise ValueError('%s is not a config' % (path))
+                _merge(config, fragment[1])
+            if parts.fragment:
+                config = Loader.project(config, parts)
+            return config, True, (key, config)
+
+Loader.register_scheme('dir', DirectoryLoader)
@@ -1,19 +1,116 @@
+import bz2
+import gzip
 import json
-import yaml
 
 from . import ConfigNotFoundError, Loader
 
 
+def _lzma_file(path):
+    try:
+        import lzma
+    except ImportError:
+        try:
+            from backports import lzma
+        except ImportError:
+            raise ValueError('loading %s requires lzma (backports.lzma on '
+                             'python 2)' % (path))
+    return lzma.LZMAFile(path)
+
+
 class FileLoader(Loader):
+    """ File (JSON or YAML) config loader class
+
+    Files compressed with gzip, bzip2 or xz (named e.g. config.yml.gz) are
+    decompressed as they are parsed. A YAML subtree selected by the URI's
+    fragment is found in the composed node graph, so only the subtree is
+    constructed.
+    """
+    PROJECTS = True
+    COMPRESSIONS = {'.gz': gzip.GzipFile,
+                    '.bz2': bz2.BZ2File,
+                    '.xz': _lzma_file}
+
+    @staticmethod
+    def _uncompressed(path):
+        """ :returns: path without its compression suffix (if any)
+
+        """
+        for suffix in FileLoader.COMPRESSIONS:
+            if path.endswith(suffix):
+                return path[:-len(suffix)]
+        return path
+
+    @staticmethod
+    def _open(path):
+        """ Open a file, decompressing it as it's read if it's compressed
+
+        """
+        for suffix, klass in FileLoader.COMPRESSIONS.iteritems():
+            if path.endswith(suffix):
+                return klass(path)
+        return open(path)
+
+    @staticmethod
+    def _compose(config, parts):
+        import yaml
+        loader = getattr(yaml, 'FullLoader', yaml.Loader)(config)
+        try:
+            node = loader.get_single_node()
+            for key in Loader.pointer(parts):
+                if isinstance(node, yaml.MappingNode):
+                    children = [v for k, v in node.value
+                                if isinstance(k, yaml.ScalarNode) and
+                                k.value == key]
+                elif isinstance(node, yaml.SequenceNode) and \
+                     key.isdigit() and int(key) < len(node.value):
+                    children = [node.value[int(key)]]
+                else:
+                    children = []
+                if len(children) == 0:
+                    # NOTE: e.g. merged ("<<") keys, so construct it all
+                    if hasattr(config, 'seek'):
+                        config.seek(0)
+                    return Loader.project(yaml.load(config), parts)
+                node = children[-1]
+            config = loader.construct_document(node)
+        finally:
+            loader.dispose()
+        if not isinstance(config, dict):
+            raise ValueError('%s is not a config' % (parts.geturl()))
+        return config
+
+    @staticmethod
+    def _parse(path, config, parts=None):
+        """ Parse a file's contents
+
+        :param config:  the contents, a string or file object
+        :param parts:   the file's parsed URI, whose fragment selects a
+                        subtree of the config to return
+
+        """
+        projected = parts is not None and parts.fragment != ''
+        if FileLoader._uncompressed(path).endswith(('.yml', '.yaml')):
+            if projected:
+                return FileLoader._compose(config, parts)
+            import yaml
+            return yaml.load(config)
+        if hasattr(config, 'read'):
+            config = json.load(config)
+        else:
+            config = json.loads(config)
+        if projected:
+            config = Loader.project(config, parts)
+        return config
+
     @staticmethod
     def _load(parts):
         try:
-            config = open(parts.path).read()
+            config = FileLoader._open(parts.path)
         except IOError:
             raise ConfigNotFoundError('file://%s' % (parts.path))
-        if parts.path.endswith(('.yml', '.yaml')):
-            return yaml.load(config)
-        return json.loads(config)
+        try:
+            return FileLoader._parse(parts.path, config, parts)
+        finally:
+            config.close()
 
 Loader.register_scheme('file', FileLoader)
-
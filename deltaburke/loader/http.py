@@ -0,0 +1,118 @@
+import base64
+import httplib
+import json
+import socket
+import threading
+
+from urllib import unquote
+
+from . import ConfigNotFoundError, Loader
+
+
+class HttpLoader(Loader):
+    """ HTTP(S) config loader class
+
+    Connections are kept alive and reused per host. Responses are cached along
+    with their ETag/Last-Modified validators, so reloading an unchanged config
+    costs a conditional request answered by a 304 and no parsing. Monitors
+    keep validators of their own (see fetch()), so a load from elsewhere
+    doesn't hide a change from them.
+
+    NOTE: configs returned for unchanged sources are the cached objects, they
+          must not be modified.
+    """
+    TIMEOUT = 10
+    PROJECTS = True
+
+    _lock = threading.Lock()
+    _connections = {}
+    _cache = {}
+
+    @classmethod
+    def _load(cls, parts):
+        # NOTE: cached by subtree (see Loader.pointer) too
+        key = parts.geturl()
+        config, _, state = cls.fetch(parts, cls._cache.get(key, None))
+        cls._cache[key] = state
+        return config
+
+    @classmethod
+    def _connection(cls, parts):
+        key = (parts.scheme, parts.netloc)
+        with cls._lock:
+            if key not in cls._connections:
+                cls._connections[key] = [threading.Lock(), None]
+            return cls._connections[key]
+
+    @classmethod
+    def _request(cls, connection, parts, headers):
+        host = parts.netloc.rpartition('@')[2]
+        if connection[1] is None:
+            klass = httplib.HTTPSConnection if parts.scheme == 'https' \
+                                            else httplib.HTTPConnection
+            connection[1] = klass(host, timeout=cls.TIMEOUT)
+        path = parts.path or '/'
+        if parts.query:
+            path = '%s?%s' % (path, parts.query)
+        connection[1].request('GET', path, headers=headers)
+        response = connection[1].getresponse()
+        # NOTE: the body has to be read for the connection to be reused
+        return response, response.read()
+
+    @classmethod
+    def fetch(cls, parts, state=None):
+        """ Fetch a config, sending validators from a previous fetch
+
+        :param state:   the state returned by the caller's previous fetch of
+                        the same URI (None for an unconditional request)
+        :returns:       a (config, modified, state) tuple where modified is
+                        False if the server reported the config as unchanged
+                        since the previous fetch
+
+        """
+        url = parts._replace(fragment='').geturl()
+        etag, last_modified, config = state or (None, None, None)
+        headers = {}
+        if '@' in parts.netloc:
+            headers['Authorization'] = 'Basic %s' % \
+                base64.b64encode('%s:%s' % (unquote(parts.username or ''),
+                                            unquote(parts.password or '')))
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        if last_modified is not None:
+            headers['If-Modified-Since'] = last_modified
+        connection = cls._connection(parts)
+        with connection[0]:
+            try:
+                response, body = cls._request(connection, parts, headers)
+            except (httplib.HTTPException, socket.error):
+                # the server may have dropped the kept alive connection, so
+                # retry once with a fresh one
+                if connection[1] is not None:
+                    connection[1].close()
+                connection[1] = None
+                response, body = cls._request(connection, parts, headers)
+            if response.will_close:
+                connection[1].close()
+                connection[1] = None
+        if response.status == httplib.NOT_MODIFIED and config is not None:
+            return config, False, state
+        if response.status == httplib.NOT_FOUND:
+            raise ConfigNotFoundError(url)
+        if response.status != httplib.OK:
+            raise IOError('unexpected status %d (%s) from %s' %
+                          (response.status, response.reason, url))
+        content_type = response.getheader('content-type', '')
+        if 'yaml' in content_type or parts.path.endswith(('.yml', '.yaml')):
+            import yaml
+            config = yaml.load(body)
+        else:
+            config = json.loads(body)
+        if parts.fragment:
+            config = Loader.project(config, parts)
+        return config, True, (response.getheader('etag'),
+                              response.getheader('last-modified'),
+                              config)
+
+Loader.register_scheme('http', HttpLoader)
+Loader.register_scheme('https', HttpLoader)
@@ -11,12 +11,35 @@ class MongoLoader(Loader):
     NOTE: the URI expected here extends the format defined by 10gen. it adds
           (and requires) a collection and id field to the path element.
 
-          mongodb://[username:password@]host1[:port1][...[,hostN[:portN]]]/database/collection/id[?options]
+          mongodb://[username:password@]host1[:port1][...[,hostN[:portN]]]/database/collection/id[?options][#/json/pointer]
+
+    A subtree selected by the URI's fragment is pushed down as a projection,
+    so only the subtree is transferred.
     """
+    PROJECTS = True
+
+    @staticmethod
+    def _projection(parts):
+        """ A projection of the subtree the fragment points to (or None)
+
+        Only keys that can be projected (up to an array index or a key with
+        dots or a leading $) are pushed down, the rest is selected here.
+
+        """
+        keys = []
+        for key in Loader.pointer(parts):
+            if key.isdigit() or '.' in key or key.startswith('$') or \
+               key == '':
+                break
+            keys.append(key)
+        if len(keys) == 0:
+            return None
+        return {'.'.join(keys): True}
+
     @staticmethod
     def _load(parts):
         path = ''
-        query = ''
+        query = parts.query
         try:
             path = parts.path.split('?')[0]
             query = parts.path.split('?')[1]
@@ -32,14 +55,17 @@ class MongoLoader(Loader):
                                      database,
                                      '' if query == '' else '?%s' % (query))
         client = pymongo.MongoClient(uri)
+        projection = MongoLoader._projection(parts)
         config = client.get_default_database()[collection].find_one(
-                                                            {'_id': _id})
+                                                {'_id': _id}, projection)
         if config is None and re.match(r'\d*', _id):
             config = \
                 client.get_default_database()[collection].find_one(
-                                                            {'_id': int(_id)})
+                                                {'_id': int(_id)}, projection)
         if config is None:
             raise ConfigNotFoundError(uri)
+        if parts.fragment:
+            config = Loader.project(config, parts)
         return config
 
 Loader.register_scheme('mongodb', MongoLoader)
@@ -0,0 +1,37 @@
+import threading
+
+try:
+    from contextvars import ContextVar
+except ImportError:
+    ContextVar = None
+
+
+class ContextLocal(object):
+    """ A value local to the current thread
+
+    Where contextvars are available the value is local to the current context
+    instead, so asyncio tasks get their own value too.
+
+    """
+    def __init__(self, name, default=None):
+        self._default = default
+        if ContextVar is not None:
+            self._var = ContextVar(name, default=default)
+        else:
+            self._local = threading.local()
+
+    def get(self):
+        if ContextVar is not None:
+            return self._var.get()
+        return getattr(self._local, 'value', self._default)
+
+    def set(self, value):
+        """ Set the value and return the previous one
+
+        """
+        previous = self.get()
+        if ContextVar is not None:
+            self._var.set(value)
+        else:
+            self._local.value = value
+        return previous
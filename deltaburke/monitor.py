@@ -1,10 +1,13 @@
 import hashlib
+import os
+import random
 import select
 import threading
-import time
+import traceback
 import urlparse
 
 from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
 from functools import partial
 from json import dumps
 
@@ -15,13 +18,69 @@ from loader import Loader
 try:
     import inotify.watcher as file_watcher
 
-    from inotify import IN_CLOSE_WRITE
+    from inotify import IN_CLOSE_WRITE, IN_CREATE, IN_MOVED_TO, IN_Q_OVERFLOW
 except ImportError:
     pass
 
 POLL_INTERVAL = 60
 
 
+class PollScheduler(object):
+    """ Adaptive, jittered poll intervals for a polled source
+
+    * every interval is jittered by +/- JITTER so processes polling the same
+      source drift apart instead of hitting it in lockstep
+    * a source that keeps being unchanged is polled less often, backing off
+      by BACKOFF per poll up to MAX_BACKOFF times the interval
+    * right after a change the source is polled FAST times the interval
+    * errors back off exponentially, up to MAX_ERROR_BACKOFF times the
+      interval
+    * at most MAX_CONCURRENT polls run at once per backend (scheme and host)
+
+    """
+    JITTER = .1
+    BACKOFF = 1.5
+    MAX_BACKOFF = 4
+    FAST = .25
+    MAX_ERROR_BACKOFF = 16
+    MAX_CONCURRENT = 4
+
+    _lock = threading.Lock()
+    _semaphores = {}
+
+    def __init__(self, interval, backend=None):
+        self._interval = interval
+        self._backend = backend
+        self._factor = 1.0
+
+    @property
+    def interval(self):
+        return self._interval * self._factor * \
+            random.uniform(1 - self.JITTER, 1 + self.JITTER)
+
+    def changed(self):
+        self._factor = self.FAST
+
+    def unchanged(self):
+        self._factor = min(self._factor * self.BACKOFF, self.MAX_BACKOFF)
+
+    def failed(self):
+        self._factor = min(max(self._factor, 1) * 2, self.MAX_ERROR_BACKOFF)
+
+    @contextmanager
+    def slot(self):
+        """ Hold one of the backend's concurrent poll slots
+
+        """
+        with self._lock:
+            if self._backend not in self._semaphores:
+                self._semaphores[self._backend] = \
+                    threading.BoundedSemaphore(self.MAX_CONCURRENT)
+            semaphore = self._semaphores[self._backend]
+        with semaphore:
+            yield
+
+
 class SourceMonitor(object):
     __metaclass__ = ABCMeta
 
@@ -31,10 +90,14 @@ class SourceMonitor(object):
         self._source = source
         self._hash = hash_
         self._namespace = namespace
-        self._pol_interval = poll_interval
+        self._poll_interval = poll_interval
         self._stop = None
         self._monitor_thread = None
 
+    @property
+    def poll_interval(self):
+        return self._poll_interval
+
     def is_alive(self):
         if self._monitor_thread is not None:
             return self._monitor_thread.is_alive()
@@ -46,7 +109,20 @@ class SourceMonitor(object):
 
     @staticmethod
     def hash(data):
-        return hashlib.md5(dumps(data)).hexdigest()
+        return hashlib.md5(dumps(data, sort_keys=True)).hexdigest()
+
+    def _update(self, data):
+        """ Update the source's layer of the config if data changed
+
+        :returns: whether data changed
+
+        """
+        hash_ = self.hash(data)
+        if hash_ == self._hash:
+            return False
+        self._hash = hash_
+        self._manager.update_src(self._source, data, True, self._namespace)
+        return True
 
     def start(self, how='threading'):
         if not self.is_alive():
@@ -71,6 +147,10 @@ class SourceMonitor(object):
         cls = None
         if scheme == 'file':
             cls = FileSourceMonitor
+        elif scheme == 'dir':
+            cls = DirectorySourceMonitor
+        elif scheme in ('http', 'https'):
+            cls = HttpSourceMonitor
         elif scheme == 'mongodb':
             cls = MongoSourceMonitor
         else:
@@ -81,61 +161,162 @@ class SourceMonitor(object):
         return monitor
 
 
-class FileSourceMonitor(SourceMonitor):
+class PolledSourceMonitor(SourceMonitor):
+    """ Monitor a source by polling it on a PollScheduler
+
+    Subclasses implement _check(), returning whether the source changed.
+    """
+    def _poll(self):
+        source = urlparse.urlparse(self._source)
+        scheduler = PollScheduler(self._poll_interval,
+                                  (source.scheme, source.netloc))
+        while not self._stop.is_set():
+            try:
+                with scheduler.slot():
+                    changed = self._check()
+            except Exception:
+                traceback.print_exc()
+                scheduler.failed()
+            else:
+                if changed:
+                    scheduler.changed()
+                else:
+                    scheduler.unchanged()
+            self._stop.wait(scheduler.interval)
+
+    @abstractmethod
+    def _check(self):
+        pass
+
+    def monitor(self):
+        self._poll()
+
+
+class FileSourceMonitor(PolledSourceMonitor):
+    """ Monitor a file with inotify (if available) or by polling
+
+    inotify watches the file's directory rather than the file itself, so
+    files replaced by a rename (or deleted and recreated) keep being
+    monitored. Bursts of events are debounced into a single reload.
+
+    Changes are detected on the file's raw (e.g. compressed) bytes, so an
+    unchanged file is neither decompressed nor parsed.
+    """
+    DEBOUNCE = .1
+    CHUNK_SIZE = 65536
+
     def __init__(self, manager, source, hash_, namespace=None,
                        poll_interval=POLL_INTERVAL):
         super(FileSourceMonitor, self).__init__(manager, source, hash_,
                                                 namespace, poll_interval)
         assert(source.startswith('file://'))
         self._source = source
+        self._path = urlparse.urlparse(source).path
+        self._digest = None
 
         if 'file_watcher' in globals():
+            self._dirname, self._basename = \
+                os.path.split(os.path.abspath(urlparse.urlparse(source).path))
             self._watcher = file_watcher.Watcher()
-            self._watcher.add(urlparse.urlparse(source).path,
-                              IN_CLOSE_WRITE)
-        else:
-            self._poll_interval = poll_interval
+            self._watcher.add(self._dirname,
+                              IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+            # NOTE: written to by stop() to wake the monitor thread up
+            self._wakeup = os.pipe()
+
+    def __del__(self):
+        if getattr(self, '_wakeup', None) is not None:
+            os.close(self._wakeup[0])
+            os.close(self._wakeup[1])
+
+    def stop(self):
+        if self.is_alive() and 'file_watcher' in globals():
+            self._stop.set()
+            os.write(self._wakeup[1], '\0')
+        super(FileSourceMonitor, self).stop()
+
+    def _file_digest(self):
+        digest = hashlib.md5()
+        with open(self._path, 'rb') as source:
+            for chunk in iter(partial(source.read, self.CHUNK_SIZE), ''):
+                digest.update(chunk)
+        return digest.hexdigest()
 
     def _check(self):
-        try:
-            data = retry_till_done(partial(Loader.load, self._source),
-                                   max_wait_in_secs=2,
-                                   retry_interval=.3)
-            hash_ = self.hash(data)
-            if hash_ != self._hash:
-                self._hash = hash_
-                self._manager.merge(data, True, self._namespace)
-        except ValueError:
-            raise
-        except Exception:
-            import traceback
-            traceback.print_exc()
+        digest = retry_till_done(self._file_digest,
+                                 max_wait_in_secs=2,
+                                 retry_interval=.3)
+        if digest == self._digest:
+            return False
+        data = retry_till_done(partial(Loader.load, self._source),
+                               max_wait_in_secs=2,
+                               retry_interval=.3)
+        self._digest = digest
+        return self._update(data)
 
     def _monitor_inotify(self):
+        watcher = self._watcher.fileno()
+        wakeup = self._wakeup[0]
+        pending = False
         while not self._stop.is_set():
-            rlist, _, _ = select.select([self._watcher.fileno()], [], [], 1)
-            if self._watcher.fileno() in rlist:
+            rlist, _, _ = select.select([watcher, wakeup], [], [],
+                                        self.DEBOUNCE if pending else None)
+            if wakeup in rlist:
+                os.read(wakeup, 512)
+            elif watcher in rlist:
+                for event in self._watcher.read():
+                    if event.name == self._basename or \
+                       event.mask & IN_Q_OVERFLOW:
+                        pending = True
+            elif pending:
+                pending = False
                 try:
                     self._check()
-                finally:
-                    self._watcher.read()
-                    self._watcher.add(urlparse.urlparse(self._source).path,
-                                      IN_CLOSE_WRITE)
-
-    def _monitor_poll(self):
-        while not self._stop.is_set():
-            self._check()
-            time.sleep(self._poll_interval)
+                except Exception:
+                    traceback.print_exc()
 
     def monitor(self):
         if 'file_watcher' in globals():
             self._monitor_inotify()
         else:
-            self._monitor_poll()
+            self._poll()
 
 
-class MongoSourceMonitor(SourceMonitor):
-    def monitor(self):
-        raise NotImplementedError()
+class FetchingSourceMonitor(PolledSourceMonitor):
+    """ Poll a source through a loader's fetch() method
+
+    fetch() reports whether the source changed since this monitor last
+    fetched it, so unchanged sources are neither re-parsed nor re-hashed.
+    """
+    def __init__(self, manager, source, hash_, namespace=None,
+                       poll_interval=POLL_INTERVAL):
+        super(FetchingSourceMonitor, self).__init__(manager, source, hash_,
+                                                    namespace, poll_interval)
+        # NOTE: the monitor's own validators, see HttpLoader.fetch
+        self._state = None
+
+    def _check(self):
+        parts = urlparse.urlparse(self._source)
+        data, modified, self._state = \
+            Loader.loader_for(parts.scheme).fetch(parts, self._state)
+        return modified and self._update(data)
+
+
+class HttpSourceMonitor(FetchingSourceMonitor):
+    """ Poll an HTTP(S) source with conditional requests
+
+    Unchanged sources cost a 304 over a kept alive connection and no parsing.
+    """
+
+
+class DirectorySourceMonitor(FetchingSourceMonitor):
+    """ Poll a directory of config fragments
+
+    Each poll stats the fragments and only re-parses those that changed.
+    """
+
+
+class MongoSourceMonitor(PolledSourceMonitor):
+    def _check(self):
+        return self._update(Loader.load(self._source))
 
 
@@ -0,0 +1,75 @@
+import errno
+import hashlib
+import json
+import os
+import tempfile
+import urlparse
+
+
+class SnapshotCache(object):
+    """ Last known good copies of remote config sources on local disk
+
+    Snapshots are written through whenever a remote source is loaded (or
+    changes), so a process can start from its snapshot instead of waiting on
+    the remote and refresh it in the background. Snapshots are named by a
+    hash of the source URI (which may hold credentials) and readable only by
+    their owner. Configs that can't be serialized to JSON are not cached.
+
+    """
+    SCHEMES = ('http', 'https', 'mongodb')
+
+    def __init__(self, directory):
+        self._directory = directory
+        try:
+            os.makedirs(directory, 0700)
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def covers(self, src):
+        return urlparse.urlparse(src).scheme in self.SCHEMES
+
+    def path(self, src):
+        return os.path.join(self._directory,
+                            '%s.json' % (hashlib.sha1(src).hexdigest()))
+
+    def get(self, src):
+        """ Return the snapshot of src or None
+
+        """
+        try:
+            with open(self.path(src)) as snapshot:
+                return json.load(snapshot)
+        except (IOError, ValueError):
+            return None
+
+    def put(self, src, config):
+        """ Replace the snapshot of src (atomically)
+
+        :returns: whether config was written
+
+        """
+        try:
+            data = json.dumps(config)
+        except (TypeError, ValueError):
+            return False
+        fd, path = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as snapshot:
+                snapshot.write(data)
+            os.rename(path, self.path(src))
+        except Exception:
+            os.unlink(path)
+            raise
+        return True
+
+    def delete(self, src):
+        try:
+            os.unlink(self.path(src))
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                raise
@@ -1,6 +1,71 @@
 import os
+import threading
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from hashlib import md5
+from json import dumps
+from SocketServer import ThreadingMixIn
 
 
 def data_path():
     return os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
 
+
+class ConfigServer(object):
+    """ Local HTTP server serving configs with ETags (for tests)
+
+    """
+    def __init__(self):
+        self.configs = {}
+        self.requests = []
+        self.connections = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                BaseHTTPRequestHandler.setup(self)
+                server.connections += 1
+
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers)))
+                if self.path not in server.configs:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = dumps(server.configs[self.path])
+                etag = '"%s"' % (md5(body).hexdigest())
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+        self._server = Server(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+
+    def url(self, path):
+        return 'http://127.0.0.1:%d%s' % (self._server.server_address[1],
+                                          path)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,400 @@
+""" Benchmarks for deltaburke
+
+Generates synthetic configs of a given width (keys per dict), depth (levels of
+nesting) and leaf size, and times loading, merging (once and repeatedly),
+substitutions, freezing/thawing, concurrent reads (of the whole config and of
+a path), attribute/item access of config nodes and file change propagation:
+
+    python -m deltaburke.tests.benchmark --width 10 --depth 3 --json out.json
+
+Results are printed as a table and (with --json) written as JSON, which a
+later run can be compared against with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from json import dumps
+
+from bunch import bunchify
+
+from deltaburke import ConfigManager
+from deltaburke.config import (
+    Config, ConfigPathAttr, CurrentConfigAttr, _frozen
+)
+from deltaburke.loader import Loader
+
+NAMESPACE = 'deltaburke.benchmark'
+SUB_KEY = 'subs'
+MERGES = 100
+
+
+def generate(width=10, depth=3, leaf_size=16, list_size=2, subs=0):
+    """ Generate a synthetic config
+
+    :param width:       keys per dict
+    :param depth:       levels of nested dicts
+    :param leaf_size:   length of leaf strings
+    :param list_size:   length of the list found in every dict (0 for none)
+    :param subs:        how many substitutions (see SUB_KEY) the config has;
+                        every other leaf string references one
+
+    """
+    def node(level, prefix):
+        config = {}
+        for i in xrange(width):
+            key = 'k%d' % (i)
+            path = '%s%s' % (prefix, key)
+            if level < depth:
+                config[key] = node(level + 1, '%s.' % (path))
+            elif subs > 0 and i % 2 == 0:
+                config[key] = '${s%d}' % (hash(path) % subs)
+            else:
+                config[key] = (path * leaf_size)[:leaf_size]
+        if list_size > 0:
+            config['items'] = [{'id': j, 'name': '%s%d' % (prefix, j)}
+                               for j in xrange(list_size)]
+        return config
+    config = node(1, '')
+    if subs > 0:
+        config[SUB_KEY] = dict(('s%d' % (i), 'sub%d' % (i))
+                               for i in xrange(subs))
+    return config
+
+
+def measure(func, runs=10, setup=None):
+    """ Time func (after setup, which isn't timed) runs times
+
+    :returns: the timings in seconds
+
+    """
+    timings = []
+    for _ in xrange(runs):
+        arg = setup() if setup is not None else None
+        start = time.time()
+        if setup is not None:
+            func(arg)
+        else:
+            func()
+        timings.append(time.time() - start)
+    return timings
+
+
+def summary(name, params, timings, **extra):
+    timings = sorted(timings)
+    result = {'name': name,
+              'params': params,
+              'runs': len(timings),
+              'min': timings[0],
+              'median': timings[len(timings) // 2],
+              'max': timings[-1],
+              'mean': sum(timings) / len(timings)}
+    result.update(extra)
+    return result
+
+
+def bench_loader_load(params, tmpdir):
+    path = os.path.join(tmpdir, 'loader.json')
+    with open(path, 'w') as config:
+        config.write(dumps(generate(**params['config'])))
+    src = 'file://%s' % (path)
+    return summary('loader_load', params,
+                   measure(lambda: Loader.load(src), params['runs']))
+
+
+def bench_manager_load(params, tmpdir):
+    mgr = ConfigManager()
+    data = generate(**params['config'])
+    try:
+        return summary('manager_load', params,
+                       measure(lambda: mgr.load(data, False, NAMESPACE,
+                                                sub_key=SUB_KEY),
+                               params['runs']))
+    finally:
+        mgr.delete(NAMESPACE)
+
+
+def bench_manager_merge(params, tmpdir):
+    mgr = ConfigManager()
+    data = generate(**params['config'])
+    update = {'k0': {'merged': True}}
+    def setup():
+        mgr.load(data, False, NAMESPACE, sub_key=SUB_KEY)
+    try:
+        return summary('manager_merge', params,
+                       measure(lambda _: mgr.merge(update, False, NAMESPACE),
+                               params['runs'], setup))
+    finally:
+        mgr.delete(NAMESPACE)
+
+
+def bench_manager_merges(params, tmpdir):
+    """ Time merges piling up on the same namespace (MERGES per run)
+
+    """
+    mgr = ConfigManager()
+    mgr.load(generate(**params['config']), False, NAMESPACE, sub_key=SUB_KEY)
+    merges = iter(xrange(MERGES * params['runs']))
+    def run():
+        for _ in xrange(MERGES):
+            mgr.merge({'k0': {'merged': next(merges)}}, False, NAMESPACE)
+    try:
+        return summary('manager_merges', params,
+                       [timing / MERGES
+                        for timing in measure(run, params['runs'])],
+                       layers=len(mgr._layers[NAMESPACE]))
+    finally:
+        mgr.delete(NAMESPACE)
+
+
+def bench_do_subs(params, tmpdir):
+    config = dict(params['config'], subs=max(params['config']['subs'], 10))
+    data = generate(**config)
+    return summary('do_subs', dict(params, config=config),
+                   measure(lambda config: config._do_subs(SUB_KEY),
+                           params['runs'],
+                           lambda: Config(data)))
+
+
+def bench_freeze(params, tmpdir):
+    data = generate(**params['config'])
+    return summary('freeze', params,
+                   measure(lambda config: config._freeze(), params['runs'],
+                           lambda: Config(data)))
+
+
+def bench_thaw(params, tmpdir):
+    data = generate(**params['config'])
+    def setup():
+        config = Config(data)
+        config._freeze()
+        return config
+    return summary('thaw', params,
+                   measure(lambda config: config._thaw(), params['runs'],
+                           setup))
+
+
+def _read_latency(name, params, reader):
+    """ Time reader(reads) run from many threads at once
+
+    """
+    mgr = ConfigManager()
+    mgr.load(generate(**params['config']), False, NAMESPACE)
+    reads = params['reads']
+
+    def run():
+        threads = [threading.Thread(target=reader, args=(reads,))
+                   for _ in xrange(params['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    try:
+        timings = measure(run, params['runs'])
+    finally:
+        mgr.delete(NAMESPACE)
+    total = reads * params['threads']
+    return summary(name, params,
+                   [timing / reads for timing in timings],
+                   reads_per_sec=total / min(timings))
+
+
+def bench_read_latency(params, tmpdir):
+    """ Read a leaf through CurrentConfigAttr
+
+    """
+    keys = ['k0'] * params['config']['depth']
+
+    class Reader(object):
+        config = CurrentConfigAttr(NAMESPACE)
+
+        def read(self, reads):
+            for _ in xrange(reads):
+                node = self.config
+                for key in keys:
+                    node = node[key]
+
+    return _read_latency('read_latency', params, Reader().read)
+
+
+def bench_path_read_latency(params, tmpdir):
+    """ Read a leaf through ConfigPathAttr
+
+    """
+    class Reader(object):
+        leaf = ConfigPathAttr(['k0'] * params['config']['depth'],
+                              namespace=NAMESPACE)
+
+        def read(self, reads):
+            for _ in xrange(reads):
+                self.leaf
+
+    return _read_latency('path_read_latency', params, Reader().read)
+
+
+def _access(name, params, node, access):
+    """ Time reading every key of node (reads times) with access
+
+    """
+    keys = [k for k in node.keys() if k != 'items']
+    def run():
+        for _ in xrange(params['reads']):
+            for key in keys:
+                access(node, key)
+    return summary(name, params,
+                   [timing / (params['reads'] * len(keys))
+                    for timing in measure(run, params['runs'])])
+
+
+def bench_bunch_attr_access(params, tmpdir):
+    return _access('bunch_attr_access', params,
+                   bunchify(generate(**params['config'])), getattr)
+
+
+def bench_frozen_attr_access(params, tmpdir):
+    return _access('frozen_attr_access', params,
+                   _frozen(generate(**params['config'])), getattr)
+
+
+def bench_frozen_item_access(params, tmpdir):
+    return _access('frozen_item_access', params,
+                   _frozen(generate(**params['config'])),
+                   lambda node, key: node[key])
+
+
+def bench_file_monitor(params, tmpdir):
+    """ Time from a monitored file being written to the update callback
+
+    """
+    mgr = ConfigManager()
+    path = os.path.join(tmpdir, 'monitor.json')
+    data = generate(**params['config'])
+    with open(path, 'w') as config:
+        config.write(dumps(data))
+    interval = mgr.monitor_interval
+    mgr.monitor_interval = .05
+    updated = threading.Event()
+    def callback(config):
+        updated.set()
+    mgr.load('file://%s' % (path), False, NAMESPACE, True)
+    mgr.register_update_callback(callback, NAMESPACE)
+    version = [0]
+    def run():
+        version[0] += 1
+        updated.clear()
+        with open(path, 'w') as config:
+            config.write(dumps(dict(data, version=version[0])))
+        if not updated.wait(10):
+            raise RuntimeError('no update within 10s')
+    try:
+        # NOTE: let the monitor settle before the first change
+        time.sleep(.2)
+        return summary('file_monitor', params, measure(run, params['runs']))
+    finally:
+        mgr.unregister_update_callback(callback, NAMESPACE)
+        mgr.delete(NAMESPACE)
+        mgr.monitor_interval = interval
+
+
+BENCHMARKS = [('loader_load', bench_loader_load),
+              ('manager_load', bench_manager_load),
+              ('manager_merge', bench_manager_merge),
+              ('manager_merges', bench_manager_merges),
+              ('do_subs', bench_do_subs),
+              ('freeze', bench_freeze),
+              ('thaw', bench_thaw),
+              ('read_latency', bench_read_latency),
+              ('path_read_latency', bench_path_read_latency),
+              ('bunch_attr_access', bench_bunch_attr_access),
+              ('frozen_attr_access', bench_frozen_attr_access),
+              ('frozen_item_access', bench_frozen_item_access),
+              ('file_monitor', bench_file_monitor)]
+
+
+def run(names=None, width=10, depth=3, leaf_size=16, list_size=2, subs=0,
+        runs=10, threads=4, reads=10000):
+    """ Run the benchmarks
+
+    :param names:   the benchmarks to run (all of them if None)
+    :returns:       a JSON serializable report
+
+    """
+    params = {'config': {'width': width,
+                         'depth': depth,
+                         'leaf_size': leaf_size,
+                         'list_size': list_size,
+                         'subs': subs},
+              'runs': runs,
+              'threads': threads,
+              'reads': reads}
+    tmpdir = tempfile.mkdtemp()
+    results = []
+    try:
+        for name, benchmark in BENCHMARKS:
+            if names is None or name in names:
+                results.append(benchmark(params, tmpdir))
+    finally:
+        shutil.rmtree(tmpdir)
+    return {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.time(),
+            'results': results}
+
+
+def compare(report, baseline):
+    """ Ratios of median timings of report to baseline, by benchmark
+
+    """
+    medians = dict((result['name'], result['median'])
+                   for result in baseline['results'])
+    return dict((result['name'], result['median'] / medians[result['name']])
+                for result in report['results']
+                if medians.get(result['name'], 0) > 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmark deltaburke')
+    parser.add_argument('--only', help='comma separated benchmarks to run')
+    parser.add_argument('--width', type=int, default=10)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--leaf-size', type=int, default=16)
+    parser.add_argument('--list-size', type=int, default=2)
+    parser.add_argument('--subs', type=int, default=0)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--reads', type=int, default=10000)
+    parser.add_argument('--json', help='write the report to this file '
+                                       '(- for stdout)')
+    parser.add_argument('--compare', help='a report to compare against')
+    args = parser.parse_args(argv)
+
+    report = run(None if args.only is None else args.only.split(','),
+                 args.width, args.depth, args.leaf_size, args.list_size,
+                 args.subs, args.runs, args.threads, args.reads)
+    if args.compare is not None:
+        with open(args.compare) as baseline:
+            report['compare'] = compare(report, json.load(baseline))
+
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        return
+    if args.json is not None:
+        with open(args.json, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    for result in report['results']:
+        line = '%-18s median %.3es  min %.3es  max %.3es' % \
+            (result['name'], result['median'], result['min'], result['max'])
+        if result['name'] in report.get('compare', {}):
+            line += '  x%.2f' % (report['compare'][result['name']])
+        print line
+
+
+if __name__ == '__main__':
+    main()
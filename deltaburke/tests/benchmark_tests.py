@@ -0,0 +1,30 @@
+import json
+
+from unittest import TestCase
+
+from deltaburke.tests import benchmark
+
+
+class TestBenchmark(TestCase):
+    def test_generate(self):
+        config = benchmark.generate(width=3, depth=2, leaf_size=4,
+                                    list_size=2, subs=2)
+        self.assertEqual(sorted(config.keys()),
+                         ['items', 'k0', 'k1', 'k2', benchmark.SUB_KEY])
+        self.assertEqual(sorted(config['k1'].keys()),
+                         ['items', 'k0', 'k1', 'k2'])
+        self.assertTrue(config['k1']['k0'].startswith('${s'))
+        self.assertEqual(len(config['k1']['k1']), 4)
+        self.assertEqual(config['items'][1], {'id': 1, 'name': '1'})
+
+    def test_run(self):
+        report = benchmark.run(width=3, depth=2, runs=2, threads=2, reads=10)
+        self.assertEqual([result['name'] for result in report['results']],
+                         [name for name, _ in benchmark.BENCHMARKS])
+        for result in report['results']:
+            self.assertEqual(result['runs'], 2)
+            self.assertTrue(0 <= result['min'] <= result['median'] <=
+                            result['max'])
+        report = json.loads(json.dumps(report))
+        self.assertEqual(sorted(benchmark.compare(report, report).values()),
+                         [1.0] * len(report['results']))
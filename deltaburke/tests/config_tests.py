@@ -1,17 +1,21 @@
 import os
+import shutil
 import threading
 
 from copy import copy, deepcopy
 from functools import partial
 from json import dumps
-from tempfile import mkstemp
+from tempfile import mkdtemp, mkstemp
 from unittest import TestCase
 
 from bunch import Bunch
 
 from deltaburke.config import (
-    Config, ConfigManager, CurrentConfigAttr, FrozenError
+    Config, ConfigManager, ConfigPathAttr, CurrentConfigAttr, FrozenError,
+    fingerprint
 )
+from deltaburke.loader import Loader
+from deltaburke.tests import ConfigServer, data_path
 
 
 class TestConfig(TestCase):
@@ -78,6 +82,79 @@ class TestConfig(TestCase):
             error = e
         self.assertIsInstance(error, FrozenError)
 
+    def test_freeze_lists(self):
+        self.config._freeze()
+        self.assertEqual(self.config.c, [1, 2, 3, {'z': 1}])
+        self.assertRaises(AttributeError, getattr, self.config.c, 'append')
+        self.assertRaises(FrozenError, setattr, self.config.c[3], 'z', 2)
+        self.assertRaises(FrozenError, self.config.d.update, {'x': 1})
+        other = Config({'a': 1,
+                        'b': 2,
+                        'c': [1, 2, 3, {'z': 1}],
+                        'd': {'e': {'f': 1}}})
+        other._freeze()
+        self.assertEqual(hash(self.config), hash(other))
+        cache = {self.config.c: 'c', self.config.d: 'd'}
+        self.assertEqual(cache[self.config.c], 'c')
+        self.assertEqual(cache[self.config.d], 'd')
+
+        self.config._thaw()
+        self.assertIsInstance(self.config.c, list)
+        self.config.c[3].z = 2
+        self.assertEqual(self.config.c, [1, 2, 3, {'z': 2}])
+
+    def test_frozen_attributes(self):
+        config = Config({'a': 1,
+                         'items': 2,
+                         '_b': 3,
+                         'd': {'keys': 4, 'e': {'f': 5}}})
+        config._freeze()
+        self.assertEqual(config.a, 1)
+        self.assertEqual(config.d.e.f, 5)
+        self.assertIs(config.d.e, config.d['e'])
+        self.assertEqual(config._b, 3)
+        self.assertTrue(callable(config.items))
+        self.assertTrue(callable(config.d.keys))
+        self.assertEqual(config.d['keys'], 4)
+        self.assertRaises(AttributeError, getattr, config, 'x')
+        self.assertRaises(AttributeError, getattr, config.d, 'x')
+        # NOTE: items are not copied into the instance dictionary
+        self.assertNotIn('a', config.__dict__)
+        self.assertNotIn('e', config.d.__dict__)
+
+        config._thaw()
+        config.a = 6
+        self.assertEqual(config['a'], 6)
+        config._freeze()
+        self.assertEqual(config.a, 6)
+
+    def test_fingerprint(self):
+        self.config._freeze()
+        other = Config({'d': {'e': {'f': 1}},
+                        'c': [1, 2, 3, {'z': 1}],
+                        u'b': 2,
+                        'a': 1})
+        other._freeze()
+        self.assertEqual(fingerprint(self.config), fingerprint(other))
+        self.assertEqual(fingerprint(self.config.d), fingerprint(other.d))
+        self.assertEqual(fingerprint(self.config.d.e), fingerprint({'f': 1}))
+        self.assertNotEqual(fingerprint({'a': 1}), fingerprint({'a': 1.0}))
+        self.assertNotEqual(fingerprint({'a': [1, 2]}),
+                            fingerprint({'a': [2, 1]}))
+        self.assertNotEqual(fingerprint({'a': 'b'}), fingerprint({'a': ['b']}))
+
+        other._thaw()
+        other.d.e.f = 2
+        other._freeze()
+        self.assertNotEqual(fingerprint(self.config), fingerprint(other))
+        self.assertEqual(fingerprint(self.config.c), fingerprint(other.c))
+
+    def test_method_named_keys(self):
+        config = Config({'lookup': 1, 'fingerprint': 2, 'derive': 3})
+        config._freeze()
+        self.assertEqual((config.lookup, config.fingerprint, config.derive),
+                         (1, 2, 3))
+
     def test_thaw(self):
         self.config._freeze()
 
@@ -129,10 +206,54 @@ class TestConfig(TestCase):
         clone.a = 3
         self.assertEqual(clone.a, 3)
 
+    def test_mutable_clone_copy_on_write(self):
+        self.config._freeze()
+        clone = self.config.mutable_clone()
+        self.assertIs(dict.__getitem__(clone, 'd'), self.config.d)
+        clone.d.e.f = 2
+        clone.c.append(4)
+        self.assertEqual(clone.d.e.f, 2)
+        self.assertEqual(clone.c, [1, 2, 3, {'z': 1}, 4])
+        self.assertEqual(self.config.d.e.f, 1)
+        self.assertEqual(self.config.c, [1, 2, 3, {'z': 1}])
+
+    def test_mutable_clone_accessors(self):
+        self.config._freeze()
+        def clone():
+            return self.config.mutable_clone()
+        for v in clone().values():
+            if isinstance(v, dict):
+                v.x = 1
+        for v in clone().itervalues():
+            if isinstance(v, list):
+                v.append(1)
+        for k, v in clone().items():
+            if k == 'd':
+                v.e.f = 2
+        for k, v in clone().iteritems():
+            if k == 'c':
+                v[3].z = 2
+        clone().setdefault('d', {}).e.f = 2
+        clone().pop('d').e.f = 2
+        self.assertEqual(clone().pop('x', 1), 1)
+        popped = clone()
+        while len(popped) > 0:
+            k, v = popped.popitem()
+            if isinstance(v, dict):
+                v.x = 1
+        copied = clone().copy()
+        copied.d.e.f = 2
+        copied.c.append(4)
+        self.assertEqual(self.config.d, {'e': {'f': 1}})
+        self.assertEqual(self.config.c, [1, 2, 3, {'z': 1}])
+        self.assertEqual(clone(), self.config)
+
     def test_deepcopy(self):
         self.config._freeze()
         clone = deepcopy(self.config)
         self.assertEqual(self.config, clone)
+        clone.d.e.f = 2
+        self.assertEqual(self.config.d.e.f, 1)
 
 
 class TestCurrentConfigAttr(TestCase):
@@ -151,6 +272,98 @@ class TestCurrentConfigAttr(TestCase):
         self.assertEqual(self._current_config.config,
                          {'a': 'b', 'c': {'d': 'e', 'f': 'g'}})
 
+    def test_pinned(self):
+        mgr = ConfigManager()
+        mgr.load({'a': 'b'})
+        seen = []
+        def other_thread():
+            seen.append(self._current_config.config)
+        with mgr.pinned() as config:
+            self.assertEqual(config, {'a': 'b'})
+            mgr.merge({'a': 'c'})
+            self.assertIs(self._current_config.config, config)
+            self.assertIs(mgr.config, config)
+            with mgr.pinned() as inner:
+                self.assertIs(inner, config)
+            thread = threading.Thread(target=other_thread)
+            thread.start()
+            thread.join()
+            self.assertEqual(seen[0], {'a': 'c'})
+        self.assertEqual(self._current_config.config, {'a': 'c'})
+        self.assertEqual(config, {'a': 'b'})
+
+    def test_pinned_reused(self):
+        mgr = ConfigManager()
+        mgr.load({'a': 1})
+        pin = mgr.pinned()
+        with pin as outer:
+            with pin as inner:
+                self.assertIs(inner, outer)
+            mgr.merge({'a': 2})
+            self.assertIs(mgr.config, outer)
+        self.assertEqual(mgr.config.a, 2)
+
+        entered = threading.Event()
+        exited = threading.Event()
+        seen = []
+        def other_thread():
+            with pin as config:
+                seen.append(config.a)
+                entered.set()
+                exited.wait(5)
+            mgr.merge({'a': 99})
+            seen.append(mgr.config.a)
+        thread = threading.Thread(target=other_thread)
+        with pin:
+            thread.start()
+            entered.wait(5)
+        exited.set()
+        thread.join(5)
+        self.assertEqual(seen, [2, 99])
+        self.assertEqual(mgr.config.a, 99)
+
+    def test_pinned_decorator(self):
+        mgr = ConfigManager()
+        mgr.load({'a': 'b'})
+        @mgr.pinned()
+        def work():
+            before = self._current_config.config
+            mgr.load({'a': 'c'})
+            return before, self._current_config.config
+        before, after = work()
+        self.assertIs(before, after)
+        self.assertEqual(after, {'a': 'b'})
+        self.assertEqual(work()[1], {'a': 'c'})
+
+    def test_config_path_attr(self):
+        mgr = ConfigManager()
+        converted = []
+        def converter(node):
+            converted.append(node)
+            return sorted(node.values())
+        class Server(object):
+            ports = ConfigPathAttr('server.ports', converter)
+            host = ConfigPathAttr(('server', 'host'), default='localhost')
+        server = Server()
+        self.assertIsNone(server.ports)
+        self.assertEqual(server.host, 'localhost')
+
+        mgr.load({'server': {'ports': {'http': 80, 'https': 443}},
+                  'other': 1})
+        self.assertEqual(server.ports, [80, 443])
+        self.assertEqual(server.ports, [80, 443])
+        self.assertEqual(len(converted), 1)
+        mgr.merge({'other': 2, 'server': {'host': 'example.com'}})
+        self.assertEqual(server.ports, [80, 443])
+        self.assertEqual(server.host, 'example.com')
+        self.assertEqual(len(converted), 1)
+
+        with mgr.pinned():
+            mgr.merge({'server': {'ports': {'http': 8080}}})
+            self.assertEqual(server.ports, [80, 443])
+        self.assertEqual(server.ports, [443, 8080])
+        self.assertEqual(len(converted), 2)
+
 
 class TestConfigManager(TestCase):
     def setUp(self):
@@ -227,6 +440,35 @@ class TestConfigManager(TestCase):
             mgr.unregister_update_callback(cb_bar_partial)
         self.assertEqual(len(ConfigManager()._update_signals.keys()), 2)
 
+    def test_namespace_is_thread_local(self):
+        mgr = ConfigManager()
+        mgr.load({'a': 1}, namespace='foo')
+        mgr.load({'a': 2}, namespace='bar')
+        entered = threading.Event()
+        done = threading.Event()
+        seen = []
+        def other_thread():
+            with mgr.namespace('bar'):
+                entered.set()
+                done.wait(3)
+                seen.append(mgr.config)
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        try:
+            entered.wait(3)
+            with mgr.namespace('foo'):
+                self.assertEqual(mgr.config, {'a': 1})
+                mgr.merge({'b': 1})
+            self.assertEqual(mgr._get_namespace(None),
+                             ConfigManager.DEFAULT_NAMESPACE)
+        finally:
+            done.set()
+            thread.join()
+        self.assertEqual(seen, [{'a': 2}])
+        self.assertEqual(mgr.get_config('foo'), {'a': 1, 'b': 1})
+        mgr.delete('foo')
+        mgr.delete('bar')
+
     def test_monitor(self):
         fd, path = mkstemp()
         try:
@@ -262,7 +504,8 @@ class TestConfigManager(TestCase):
 
             callback_event.wait(3)
             self.assertEqual(len(call_args), 2)
-            self.assertEqual(mgr.config, {'a': 'b', 'c': {'d': 'f', 'g': 'h'}})
+            # the source's layer is replaced, not merged on top
+            self.assertEqual(mgr.config, {'a': 'b', 'c': {'g': 'h'}})
             callback_event.clear()
 
             mgr.delete()
@@ -271,6 +514,349 @@ class TestConfigManager(TestCase):
         finally:
             os.unlink(path)
 
+    def test_merges_fold_into_one_layer(self):
+        src = 'file://%s' % (os.path.join(data_path(), 'loader_test.json'))
+        mgr = ConfigManager()
+        mgr.load(src, namespace='folded')
+        try:
+            for i in xrange(100):
+                mgr.merge({'a': i, 'f': {'g': {'i': i}}}, namespace='folded')
+            self.assertEqual(len(mgr._layers['folded']), 2)
+            self.assertEqual(mgr.get_config('folded').a, 99)
+            self.assertEqual(mgr.get_config('folded').f,
+                             {'g': {'h': 5, 'i': 99}})
+            before = mgr.get_config('folded')
+            mgr.merge({'b': 3}, namespace='folded')
+            self.assertIs(mgr.get_config('folded').f, before.f)
+            # NOTE: sources keep their own layer, so they can be updated
+            mgr.merge([src, {'b': 4}, {'c': 5}], namespace='folded')
+            self.assertEqual(len(mgr._layers['folded']), 4)
+            self.assertEqual(mgr.get_config('folded').a, 1)
+            mgr.update_src(src, {'a': 6}, False, 'folded')
+            self.assertEqual(mgr.get_config('folded'),
+                             {'a': 6, 'b': 4, 'c': 5,
+                              'f': {'g': {'i': 99}}})
+        finally:
+            mgr.delete('folded')
+
+    def test_update_src_keeps_precedence(self):
+        src = 'file://%s' % (os.path.join(data_path(), 'loader_test.json'))
+        mgr = ConfigManager()
+        mgr.load([src] + self.configs[1:3], namespace='layers')
+        mgr.merge(self.configs[3:], namespace='layers')
+        try:
+            before = mgr.get_config('layers')
+            mgr.update_src(src, {'a': 0, 'b': 3, 'c': [3, 4, {'d': 'e'}],
+                                 'f': {'g': {'h': 6, 'j': 0}}},
+                           False, 'layers')
+            after = mgr.get_config('layers')
+            self.assertEqual(after,
+                             {'a': {'b': 10, 'w': 'x', 'y': 'z'},
+                              'b': 3,
+                              'c': [3, 4, {'d': 'e'}],
+                              'i': [6, 7, 8],
+                              'f': {'g': {'h': 6, 'j': 9}}})
+            self.assertIs(after.a, before.a)
+            self.assertIs(after.i, before.i)
+            mgr.update_src(src, {'f': {'k': 1}}, False, 'layers')
+            self.assertEqual(mgr.get_config('layers'),
+                             {'a': {'b': 10, 'w': 'x', 'y': 'z'},
+                              'i': [6, 7, 8],
+                              'f': {'g': {'j': 9}, 'k': 1}})
+            mgr.update_src('z', {'i': 1}, False, 'layers')
+            self.assertEqual(mgr.get_config('layers').i, 1)
+        finally:
+            mgr.delete('layers')
+
+    def test_indexes(self):
+        mgr = ConfigManager()
+        mgr.load({'tenants': {'1': {'hostname': 'a.com'},
+                              '2': {'hostname': 'b.com'}},
+                  'routes': [{'match': {'path': '/a'}, 'to': 'a'},
+                             {'match': {'path': '/b'}, 'to': 'b'}]},
+                 namespace='indexed')
+        try:
+            mgr.add_index('tenants', 'hostname', 'indexed')
+            mgr.add_index('routes', 'match.path', 'indexed')
+            self.assertEqual(mgr.lookup('tenants', 'hostname', 'b.com',
+                                        namespace='indexed'),
+                             {'hostname': 'b.com'})
+            self.assertEqual(mgr.lookup('routes', 'match.path', '/a',
+                                        namespace='indexed').to, 'a')
+            self.assertIsNone(mgr.lookup('tenants', 'hostname', 'c.com',
+                                         namespace='indexed'))
+            self.assertRaises(ValueError, mgr.lookup, 'tenants', 'name', 'a',
+                              namespace='indexed')
+
+            before = mgr.get_config('indexed')
+            mgr.merge({'tenants': {'2': {'hostname': 'c.com'}}},
+                      namespace='indexed')
+            after = mgr.get_config('indexed')
+            self.assertEqual(after._lookup('tenants', 'hostname', 'c.com'),
+                             {'hostname': 'c.com'})
+            self.assertIsNone(after._lookup('tenants', 'hostname', 'b.com'))
+            self.assertEqual(before._lookup('tenants', 'hostname', 'b.com'),
+                             {'hostname': 'b.com'})
+            self.assertIs(after._indexes[(('routes',), ('match', 'path'))],
+                          before._indexes[(('routes',), ('match', 'path'))])
+        finally:
+            mgr.delete('indexed')
+
+    def test_snapshots(self):
+        mgr = ConfigManager()
+        directory = mkdtemp()
+        server = ConfigServer()
+        server.configs['/config.json'] = {'a': 1}
+        server.start()
+        url = server.url('/config.json')
+        updated = threading.Event()
+        def callback(config):
+            updated.set()
+        mgr.register_update_callback(callback, 'snapshots')
+        try:
+            mgr.snapshot_dir = directory
+            mgr.load(url, namespace='snapshots')
+            self.assertEqual(mgr.get_config('snapshots'), {'a': 1})
+            self.assertEqual(mgr._snapshots.get(url), {'a': 1})
+
+            # NOTE: starts from the snapshot, then catches up
+            server.configs['/config.json'] = {'a': 2}
+            updated.clear()
+            mgr.load(url, False, 'snapshots')
+            self.assertEqual(mgr.get_config('snapshots'), {'a': 1})
+            self.assertTrue(updated.wait(3))
+            self.assertEqual(mgr.get_config('snapshots'), {'a': 2})
+            self.assertEqual(mgr._snapshots.get(url), {'a': 2})
+
+            # NOTE: no update if the snapshot is current
+            requests = len(server.requests)
+            updated.clear()
+            mgr.load(url, False, 'snapshots')
+            self.assertEqual(mgr.get_config('snapshots'), {'a': 2})
+            self.assertFalse(updated.wait(.5))
+            self.assertEqual(len(server.requests), requests + 1)
+        finally:
+            mgr.unregister_update_callback(callback, 'snapshots')
+            mgr.snapshot_dir = None
+            mgr.delete('snapshots')
+            server.stop()
+            shutil.rmtree(directory)
+
+    def test_shared_remote_source(self):
+        mgr = ConfigManager()
+        mgr.monitor_interval = .1
+        server = ConfigServer()
+        server.configs['/config.json'] = {'a': 1}
+        server.start()
+        url = server.url('/config.json')
+        try:
+            mgr.load(url, namespace='shared1', monitor=True)
+            mgr.load(url, namespace='shared2', monitor=True)
+            server.configs['/config.json'] = {'a': 2}
+            # NOTE: neither the other monitor's fetch nor a load from
+            #       elsewhere hides the change
+            Loader.load(url)
+            for _ in xrange(50):
+                if mgr.get_config('shared1').a == 2 and \
+                   mgr.get_config('shared2').a == 2:
+                    break
+                threading.Event().wait(.1)
+            self.assertEqual(mgr.get_config('shared1'), {'a': 2})
+            self.assertEqual(mgr.get_config('shared2'), {'a': 2})
+        finally:
+            mgr.delete('shared1')
+            mgr.delete('shared2')
+            server.stop()
+
+    def test_monitors_stop_unlocked(self):
+        mgr = ConfigManager()
+        lock = mgr._namespace_lock('stopping')
+        stopped = []
+        class Monitor(object):
+            # NOTE: like a monitor whose thread is updating the namespace
+            def stop(self):
+                def update():
+                    with lock:
+                        pass
+                thread = threading.Thread(target=update)
+                thread.start()
+                thread.join(5)
+                stopped.append(not thread.is_alive())
+        mgr.load({'a': 1}, namespace='stopping')
+        mgr._monitors['stopping'] = {'x': Monitor()}
+        mgr.stop_src_monitor('x', 'stopping')
+        mgr._monitors['stopping'] = {'x': Monitor(), 'y': Monitor()}
+        mgr.delete('stopping')
+        self.assertEqual(stopped, [True, True, True])
+        self.assertNotIn('stopping', mgr._monitors)
+
+    def test_namespaces_load_in_parallel(self):
+        mgr = ConfigManager()
+        loading = []
+        loaded = threading.Event()
+        release = threading.Event()
+        class SlowLoader(Loader):
+            @staticmethod
+            def _load(parts):
+                loading.append(parts.netloc)
+                if len(loading) == 2:
+                    loaded.set()
+                release.wait(5)
+                return {'slow': parts.netloc}
+        Loader.register_scheme('slow', SlowLoader)
+        mgr.load({'a': 1}, namespace='striped.0')
+        threads = [threading.Thread(target=mgr.load,
+                                    args=('slow://%d' % (i),),
+                                    kwargs={'namespace': 'striped.%d' % (i)})
+                   for i in xrange(2)]
+        try:
+            for thread in threads:
+                thread.start()
+            # NOTE: both loads are in progress at once...
+            self.assertTrue(loaded.wait(3))
+            # ...and neither blocks reads or other namespaces
+            self.assertEqual(mgr.get_config('striped.0'), {'a': 1})
+            mgr.load({'b': 1}, namespace='striped.2')
+            mgr.merge({'b': 2}, namespace='striped.2')
+            self.assertEqual(mgr.get_config('striped.2'), {'b': 2})
+            self.assertFalse(release.is_set())
+        finally:
+            release.set()
+            for thread in threads:
+                thread.join()
+            del Loader._schemes['slow']
+        self.assertEqual(mgr.get_config('striped.0'), {'slow': '0'})
+        self.assertEqual(mgr.get_config('striped.1'), {'slow': '1'})
+        for i in xrange(3):
+            mgr.delete('striped.%d' % (i))
+
+    def test_fingerprint(self):
+        mgr = ConfigManager()
+        mgr.load(self.configs[0], namespace='fingerprint')
+        config = mgr.get_config('fingerprint')
+        before = mgr.fingerprint(namespace='fingerprint')
+        self.assertEqual(before, fingerprint(self.configs[0]))
+        mgr.merge({'f': {'g': {'j': 9}}}, namespace='fingerprint')
+        after = mgr.get_config('fingerprint')
+        # NOTE: the unchanged subtree's fingerprint is reused
+        self.assertIs(after.c, config.c)
+        self.assertIn('_fingerprint', after.c.__dict__)
+        self.assertNotEqual(mgr.fingerprint(namespace='fingerprint'), before)
+        self.assertEqual(mgr.fingerprint('f.g', 'fingerprint'),
+                         fingerprint({'h': 5, 'j': 9}))
+        self.assertIsNone(mgr.fingerprint('f.x', 'fingerprint'))
+        mgr.delete('fingerprint')
+        self.assertIsNone(mgr.fingerprint(namespace='fingerprint'))
+
+    def test_derive(self):
+        mgr = ConfigManager()
+        calls = []
+        def total(g, c):
+            calls.append(g)
+            return sum(g.values()) + len(c)
+        mgr.load(self.configs[0], namespace='derive')
+        mgr.derive('total', ('f.g', 'c'), total, namespace='derive')
+        self.assertEqual(mgr.derived('total', 'derive'), 8)
+        self.assertEqual(mgr.derived('total', 'derive'), 8)
+        self.assertEqual(len(calls), 1)
+        mgr.merge({'a': 2}, namespace='derive')
+        self.assertEqual(mgr.derived('total', 'derive'), 8)
+        self.assertEqual(len(calls), 1)
+        # NOTE: reloading replaces every node, but with equal ones
+        mgr.load(self.configs[0], namespace='derive')
+        self.assertEqual(mgr.derived('total', 'derive'), 8)
+        self.assertEqual(len(calls), 1)
+        with mgr.pinned('derive'):
+            mgr.merge(self.configs[4], namespace='derive')
+            self.assertEqual(mgr.derived('total', 'derive'), 8)
+        self.assertEqual(mgr.derived('total', 'derive'), 17)
+        self.assertEqual(len(calls), 2)
+        self.assertRaises(ValueError, mgr.derived, 'missing', 'derive')
+        mgr.delete('derive')
+        self.assertRaises(ValueError, mgr.derived, 'total', 'derive')
+
+    def test_evict_idle(self):
+        src = 'file://%s' % (os.path.join(data_path(), 'loader_test.json'))
+        mgr = ConfigManager()
+        mgr.max_namespaces = 1000
+        try:
+            mgr.load(self.configs[0], namespace='evict_dict')
+            mgr.load(src, namespace='evict_monitored', monitor=True)
+            mgr.load([src, self.configs[1]], namespace='evict_mixed')
+            mgr.load(src, namespace='evict_sub', sub_key='f')
+            loaded = mgr.get_config('evict_monitored')
+            for namespace in mgr._configs.keys():
+                if namespace not in ('evict_dict', 'evict_monitored'):
+                    mgr.get_config(namespace)
+            stats = mgr.namespace_stats
+            mgr.max_namespaces = stats['loaded'] - 1
+            after = mgr.namespace_stats
+            self.assertEqual(after['evictions'], stats['evictions'] + 1)
+            self.assertEqual(after['loaded'], stats['loaded'] - 1)
+            self.assertIn('evict_dict', mgr._configs)
+            self.assertNotIn('evict_monitored', mgr._configs)
+            self.assertNotIn('evict_monitored', mgr._monitors)
+
+            config = mgr.get_config('evict_monitored')
+            self.assertEqual(config, loaded)
+            self.assertIn(src, mgr._monitors['evict_monitored'])
+            after = mgr.namespace_stats
+            self.assertEqual(after['misses'], stats['misses'] + 1)
+            # NOTE: loading it again evicted the next idle namespace, but not
+            #       one with a layer that has no source
+            self.assertEqual(after['evictions'], stats['evictions'] + 2)
+            self.assertIn('evict_mixed', mgr._configs)
+
+            mgr.max_namespaces = None
+            mgr._evict('evict_sub')
+            self.assertIn('evict_sub', mgr._evicted)
+            mgr.merge({'x': 1}, namespace='evict_sub')
+            self.assertEqual(mgr.get_config('evict_sub').x, 1)
+            self.assertEqual(mgr.get_config('evict_sub').f, {'g': {'h': 5}})
+        finally:
+            mgr.max_namespaces = None
+            for namespace in ('evict_dict', 'evict_monitored', 'evict_mixed',
+                              'evict_sub'):
+                mgr.delete(namespace)
+        self.assertEqual(mgr.namespace_stats['evicted'], 0)
+
+    def test_load_many(self):
+        mgr = ConfigManager()
+        batches = []
+        updates = []
+        def batch_callback(namespaces):
+            batches.append(namespaces)
+        def callback(config):
+            updates.append(config)
+        mgr.register_batch_update_callback(batch_callback)
+        mgr.register_update_callback(callback, namespace='batch1')
+        try:
+            mgr.load({'a': 1}, namespace='batch0')
+            mgr.overlay('batch0', {'b': 2}, namespace='batch0.overlay')
+            changed = mgr.load_many({'batch0': {'a': 1},
+                                     'batch1': self.configs[1],
+                                     'batch2': self.configs[2]})
+            self.assertEqual(changed, ['batch1', 'batch2'])
+            self.assertEqual(batches, [['batch1', 'batch2']])
+            self.assertEqual(updates, [self.configs[1]])
+            self.assertEqual(mgr.get_config('batch2'), self.configs[2])
+
+            changed = mgr.load_many({'batch0': {'a': 2}})
+            self.assertEqual(changed, ['batch0', 'batch0.overlay'])
+            self.assertEqual(mgr.get_config('batch0.overlay'),
+                             {'a': 2, 'b': 2})
+
+            self.assertRaises(Exception, mgr.load_many,
+                              {'batch1': {'c': 3},
+                               'batch3': 'file:///does/not/exist.json'})
+            self.assertEqual(mgr.get_config('batch1'), self.configs[1])
+            self.assertIsNone(mgr.get_config('batch3'))
+        finally:
+            mgr.unregister_batch_update_callback(batch_callback)
+            mgr.unregister_update_callback(callback, namespace='batch1')
+            for namespace in ('batch0', 'batch0.overlay', 'batch1', 'batch2'):
+                mgr.delete(namespace)
+
     def test_string_substitutions(self):
         source = {
             '_subs': {'foo': 'bar',
@@ -292,3 +878,84 @@ class TestConfigManager(TestCase):
 
         self.assertEqual(mgr.config.a, {'b': 'bob in wonderland', 'e': 'bar'})
 
+    def test_overlay(self):
+        mgr = ConfigManager()
+        mgr.load(self.configs[0], namespace='base')
+        try:
+            mgr.overlay('base', self.configs[4], namespace='tenant')
+            base = mgr.get_config('base')
+            tenant = mgr.get_config('tenant')
+            self.assertEqual(tenant,
+                             {'a': 1,
+                              'b': 2,
+                              'c': [3, 4, {'d': 'e'}],
+                              'f': {'g': {'h': 5, 'j': 9}}})
+            self.assertIs(tenant.c, base.c)
+            self.assertRaises(FrozenError, setattr, tenant, 'a', 2)
+
+            out = []
+            def callback(config):
+                out.append(config)
+            mgr.register_update_callback(callback, namespace='tenant')
+            mgr.merge({'b': 3, 'f': {'g': {'h': 6}}}, True, 'base')
+            self.assertEqual(len(out), 1)
+            self.assertEqual(mgr.get_config('tenant').b, 3)
+            self.assertEqual(mgr.get_config('tenant').f,
+                             {'g': {'h': 6, 'j': 9}})
+
+            mgr.merge({'a': {'k': 'l'}}, False, 'tenant')
+            self.assertEqual(mgr.get_config('tenant').a, {'k': 'l'})
+            self.assertEqual(mgr.get_config('base').a, 1)
+
+            mgr.overlay('tenant', {'b': 4}, namespace='subtenant')
+            self.assertEqual(mgr.get_config('subtenant').a, {'k': 'l'})
+            self.assertEqual(mgr.get_config('subtenant').b, 4)
+            self.assertRaises(ValueError, mgr.overlay, 'subtenant',
+                              namespace='tenant')
+            mgr.unregister_update_callback(callback, namespace='tenant')
+
+            mgr.delete('base')
+            self.assertEqual(mgr.get_config('tenant'),
+                             {'a': {'k': 'l'}, 'f': {'g': {'j': 9}}})
+            self.assertEqual(mgr.get_config('subtenant'),
+                             {'a': {'k': 'l'}, 'b': 4, 'f': {'g': {'j': 9}}})
+        finally:
+            for namespace in ('base', 'tenant', 'subtenant'):
+                mgr.delete(namespace)
+
+    def test_overlay_subs(self):
+        mgr = ConfigManager()
+        base = {'_subs': {'host': 'db1', 'port': 5432},
+                'db': {'primary': 'pg://${host}:${port}/p'}}
+        override = {'db': {'replica': 'pg://${host}:${port}/r'}}
+        try:
+            mgr.load([base, override], namespace='subs_loaded',
+                     sub_key='_subs')
+            mgr.load(base, namespace='subs_base', sub_key='_subs')
+            mgr.overlay('subs_base', override, namespace='subs_tenant')
+            self.assertEqual(mgr.get_config('subs_tenant'),
+                             mgr.get_config('subs_loaded'))
+            self.assertEqual(mgr.get_config('subs_tenant').db.replica,
+                             'pg://db1:5432/r')
+            mgr.overlay('subs_tenant', {'_subs': {'host': 'db2'},
+                                        'cache': 'redis://${host}'},
+                        namespace='subs_subtenant')
+            subtenant = mgr.get_config('subs_subtenant')
+            self.assertEqual(subtenant.cache, 'redis://db2')
+            self.assertEqual(subtenant._subs, {'host': 'db2', 'port': 5432})
+            self.assertEqual(subtenant.db, {'primary': 'pg://db2:5432/p',
+                                            'replica': 'pg://db2:5432/r'})
+            mgr.load([base, override, {'_subs': {'host': 'db2'},
+                                       'cache': 'redis://${host}'}],
+                     namespace='subs_loaded', sub_key='_subs')
+            self.assertEqual(subtenant, mgr.get_config('subs_loaded'))
+            self.assertEqual(mgr.get_config('subs_tenant').db.primary,
+                             'pg://db1:5432/p')
+
+            mgr.merge({'_subs': {'port': 6432}}, namespace='subs_base')
+            self.assertEqual(mgr.get_config('subs_subtenant').db.primary,
+                             'pg://db2:6432/p')
+        finally:
+            for namespace in ('subs_loaded', 'subs_base', 'subs_tenant',
+                              'subs_subtenant'):
+                mgr.delete(namespace)
@@ -0,0 +1,63 @@
+import os
+import shutil
+
+from json import dumps
+from tempfile import mkdtemp
+from unittest import TestCase
+from urlparse import urlparse
+
+from mock import patch
+
+from deltaburke.loader import Loader, ConfigNotFoundError
+from deltaburke.loader.directory import DirectoryLoader
+from deltaburke.loader.file import FileLoader
+
+
+class TestDirectoryLoader(TestCase):
+    def setUp(self):
+        self.path = mkdtemp()
+        self.write('10-base.json', {'a': 1, 'b': {'c': 2, 'd': 3}})
+        self.write('20-override.yml', 'b:\n    c: 4\n')
+        self.write('README', 'not a fragment')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write(self, name, data):
+        fragment = open(os.path.join(self.path, name), 'w')
+        fragment.write(data if isinstance(data, basestring) else dumps(data))
+        fragment.close()
+
+    def test_load_missing(self):
+        self.assertRaises(ConfigNotFoundError,
+                          Loader.load,
+                          'dir://%s' % (os.path.join(self.path, 'missing')))
+
+    def test_load(self):
+        data = Loader.load('dir://%s' % (self.path))
+        self.assertEqual(data, {'a': 1, 'b': {'c': 4, 'd': 3}})
+
+    def test_incremental_reload(self):
+        uri = 'dir://%s' % (self.path)
+        _, _, state = DirectoryLoader.fetch(urlparse(uri))
+        with patch.object(FileLoader, '_parse',
+                          wraps=FileLoader._parse) as parse:
+            self.assertFalse(DirectoryLoader.fetch(urlparse(uri), state)[1])
+            self.write('15-middle.json', {'b': {'d': 5}})
+            # NOTE: a fetch by someone else doesn't hide the change
+            self.assertTrue(DirectoryLoader.fetch(urlparse(uri))[1])
+            data, modified, state = DirectoryLoader.fetch(urlparse(uri), state)
+            self.assertTrue(modified)
+            self.assertEqual(data, {'a': 1, 'b': {'c': 4, 'd': 5}})
+            self.assertEqual(parse.call_count, 1)
+            os.unlink(os.path.join(self.path, '20-override.yml'))
+            data = Loader.load(uri)
+            self.assertEqual(data, {'a': 1, 'b': {'c': 2, 'd': 5}})
+            self.assertEqual(parse.call_count, 1)
+
+    def test_empty_fragment(self):
+        self.write('30-empty.yml', '')
+        data = Loader.load('dir://%s' % (self.path))
+        self.assertEqual(data, {'a': 1, 'b': {'c': 4, 'd': 3}})
+        self.write('40-scalar.yml', 'x\n')
+        self.assertRaises(ValueError, Loader.load, 'dir://%s' % (self.path))
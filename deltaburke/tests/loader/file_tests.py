@@ -1,6 +1,10 @@
+import bz2
+import gzip
 import os
+import shutil
 
-from unittest import TestCase
+from tempfile import mkdtemp
+from unittest import SkipTest, TestCase
 
 from deltaburke.loader import Loader, ConfigNotFoundError
 
@@ -35,3 +39,58 @@ class TestFileLoader(TestCase):
                             'loader_test.json')))
         self.assertEqual(data, self.data)
 
+    def test_load_subtree(self):
+        for name in ('loader_test.yml', 'loader_test.json'):
+            uri = 'file://%s' % (os.path.join(data_path, name))
+            self.assertEqual(Loader.load('%s#/f' % (uri)), {'g': {'h': 5}})
+            self.assertEqual(Loader.load('%s#/f/g' % (uri)), {'h': 5})
+            self.assertEqual(Loader.load('%s#/c/2' % (uri)), {'d': 'e'})
+            self.assertEqual(Loader.load('%s#' % (uri)), self.data)
+            self.assertRaises(ConfigNotFoundError,
+                              Loader.load, '%s#/' % (uri))
+            self.assertRaises(ConfigNotFoundError,
+                              Loader.load, '%s#/f/x' % (uri))
+            self.assertRaises(ConfigNotFoundError,
+                              Loader.load, '%s#/c/3' % (uri))
+            self.assertRaises(ValueError, Loader.load, '%s#/a' % (uri))
+            self.assertRaises(ValueError, Loader.load, '%s#f' % (uri))
+
+    def test_load_compressed(self):
+        path = mkdtemp()
+        try:
+            for name in ('loader_test.yml', 'loader_test.json'):
+                config = open(os.path.join(data_path, name)).read()
+                for suffix, klass in (('.gz', gzip.GzipFile),
+                                      ('.bz2', bz2.BZ2File)):
+                    compressed = os.path.join(path, name + suffix)
+                    output = klass(compressed, 'w')
+                    output.write(config)
+                    output.close()
+                    uri = 'file://%s' % (compressed)
+                    self.assertEqual(Loader.load(uri), self.data)
+                    self.assertEqual(Loader.load('%s#/f' % (uri)),
+                                     {'g': {'h': 5}})
+            self.assertRaises(ConfigNotFoundError, Loader.load,
+                              'file://%s' % (os.path.join(path, 'x.yml.gz')))
+        finally:
+            shutil.rmtree(path)
+
+    def test_load_xz(self):
+        try:
+            import lzma
+        except ImportError:
+            try:
+                from backports import lzma
+            except ImportError:
+                raise SkipTest('lzma is not available. skipping test...')
+        path = mkdtemp()
+        try:
+            compressed = os.path.join(path, 'loader_test.json.xz')
+            output = lzma.LZMAFile(compressed, 'w')
+            output.write(open(os.path.join(data_path,
+                                           'loader_test.json')).read())
+            output.close()
+            self.assertEqual(Loader.load('file://%s' % (compressed)),
+                             self.data)
+        finally:
+            shutil.rmtree(path)
@@ -0,0 +1,71 @@
+import base64
+
+from unittest import TestCase
+from urlparse import urlparse
+
+from deltaburke.loader import Loader, ConfigNotFoundError
+from deltaburke.loader.http import HttpLoader
+from deltaburke.tests import ConfigServer
+
+
+class TestHttpLoader(TestCase):
+    def setUp(self):
+        self.data = {'a': 1,
+                     'b': 2,
+                     'c': [3, 4, {'d': 'e'}],
+                     'f': {'g': {'h': 5}}}
+        self.server = ConfigServer()
+        self.server.configs['/config.json'] = self.data
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_load_missing(self):
+        self.assertRaises(ConfigNotFoundError,
+                          Loader.load,
+                          self.server.url('/missing.json'))
+
+    def test_load_json(self):
+        data = Loader.load(self.server.url('/config.json'))
+        self.assertEqual(data, self.data)
+
+    def test_load_subtree(self):
+        url = self.server.url('/config.json')
+        self.assertEqual(Loader.load('%s#/f/g' % (url)), {'h': 5})
+        self.assertEqual(Loader.load('%s#/c/2' % (url)), {'d': 'e'})
+        self.server.configs['/config.json'] = {'f': {'g': {'h': 6}}}
+        self.assertEqual(HttpLoader.fetch(urlparse('%s#/f/g' % (url)))[:2],
+                         ({'h': 6}, True))
+        self.assertEqual(HttpLoader.fetch(urlparse('%s#/f' % (url)))[:2],
+                         ({'g': {'h': 6}}, True))
+
+    def test_conditional_requests(self):
+        url = self.server.url('/config.json')
+        data = Loader.load(url)
+        self.assertEqual(data, self.data)
+        self.assertIs(Loader.load(url), data)
+        self.assertIn('if-none-match', self.server.requests[-1][1])
+        self.server.configs['/config.json'] = {'a': 2}
+        self.assertEqual(Loader.load(url), {'a': 2})
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_fetch_state(self):
+        parts = urlparse(self.server.url('/config.json'))
+        data, modified, state = HttpLoader.fetch(parts)
+        self.assertTrue(modified)
+        self.server.configs['/config.json'] = {'a': 2}
+        # NOTE: a fetch by someone else doesn't hide the change
+        self.assertEqual(HttpLoader.fetch(parts)[:2], ({'a': 2}, True))
+        data, modified, state = HttpLoader.fetch(parts, state)
+        self.assertEqual((data, modified), ({'a': 2}, True))
+        self.assertEqual(HttpLoader.fetch(parts, state),
+                         ({'a': 2}, False, state))
+
+    def test_credentials(self):
+        url = self.server.url('/config.json').replace('://',
+                                                      '://us%40er:p%3Ass%25@')
+        self.assertEqual(Loader.load(url), self.data)
+        self.assertEqual(self.server.requests[-1][1]['authorization'],
+                         'Basic %s' % (base64.b64encode('us@er:p:ss%')))
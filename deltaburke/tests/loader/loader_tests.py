@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+
+from unittest import TestCase
+from urlparse import urlparse
+
+from deltaburke.loader import Loader, ConfigNotFoundError
+from deltaburke.loader.file import FileLoader
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                         '..', '..', '..'))
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.time()
+import deltaburke
+elapsed = time.time() - start
+print(json.dumps({'elapsed': elapsed,
+                  'modules': [m for m in ('pymongo', 'httplib')
+                              if m in sys.modules]}))
+"""
+
+
+class TestLoader(TestCase):
+    def test_import_is_lazy(self):
+        output = subprocess.check_output([sys.executable, '-c', IMPORT_SCRIPT],
+                                         cwd=root_path)
+        result = json.loads(output.splitlines()[-1])
+        sys.stderr.write('import deltaburke: %.3fs ' % (result['elapsed']))
+        self.assertEqual(result['modules'], [])
+
+    def test_lazy_scheme(self):
+        Loader.register_lazy_scheme('lazy',
+                                    'deltaburke.loader.file:FileLoader')
+        try:
+            self.assertIs(Loader.loader_for('lazy'), FileLoader)
+            self.assertRaises(ConfigNotFoundError,
+                              Loader.load,
+                              'lazy:///does/not/exist.json')
+        finally:
+            Loader._lazy_schemes.pop('lazy')
+            Loader._schemes.pop('lazy')
+
+    def test_unknown_scheme(self):
+        self.assertRaises(ValueError, Loader.load, 'unknown:///config.json')
+
+    def test_pointer(self):
+        def pointer(fragment):
+            return Loader.pointer(urlparse('file:///config.json#%s' %
+                                           (fragment)))
+        self.assertEqual(pointer(''), ())
+        self.assertEqual(pointer('/'), ('',))
+        self.assertEqual(pointer('/a/0'), ('a', '0'))
+        self.assertEqual(pointer('/a%20b/c~1d/~0e~01'),
+                         ('a b', 'c/d', '~e~1'))
+        self.assertRaises(ValueError, pointer, 'a')
@@ -46,3 +46,15 @@ class TestMongoLoader(TestCase):
                                   'b': 2,
                                   'c': [3, 4, {'d': 'e'}],
                                   'f': {'g': {'h': 5}}})
+
+    def test_load_subtree(self):
+        config = Loader.load('mongodb://localhost/%s/foo/1#/f/g' %
+                             (self.__class__.TEST_DB))
+        self.assertEqual(config, {'h': 5})
+        config = Loader.load('mongodb://localhost/%s/foo/1#/c/2' %
+                             (self.__class__.TEST_DB))
+        self.assertEqual(config, {'d': 'e'})
+        self.assertRaises(
+            ConfigNotFoundError,
+            Loader.load,
+            'mongodb://localhost/%s/foo/2#/f' % (self.__class__.TEST_DB))
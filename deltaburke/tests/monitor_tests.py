@@ -1,24 +1,70 @@
+import gzip
 import os
+import shutil
 import threading
+import time
 
 from json import dumps
-from tempfile import mkstemp
-from unittest import TestCase
+from tempfile import mkdtemp, mkstemp
+from unittest import SkipTest, TestCase
 
-from mock import MagicMock
+from mock import MagicMock, patch
 
+from deltaburke import monitor as monitor_module
 from deltaburke.monitor import (
-    SourceMonitor, FileSourceMonitor, MongoSourceMonitor
+    PollScheduler, SourceMonitor, DirectorySourceMonitor, FileSourceMonitor,
+    HttpSourceMonitor, MongoSourceMonitor
 )
+from deltaburke.tests import ConfigServer
 
 
 class ConfigManagerMock(MagicMock):
     def __init__(self, *args, **kwargs):
         super(ConfigManagerMock, self).__init__(*args, **kwargs)
-        self.merge_event = threading.Event()
+        self.update_event = threading.Event()
+        self.update_count = 0
 
-    def merge(self, *args, **kwargs):
-        self.merge_event.set()
+    def update_src(self, *args, **kwargs):
+        self.update_count += 1
+        self.update_event.set()
+
+
+class TestPollScheduler(TestCase):
+    def test_intervals(self):
+        scheduler = PollScheduler(10)
+        for _ in xrange(100):
+            self.assertTrue(9 <= scheduler.interval <= 11)
+        for _ in xrange(10):
+            scheduler.unchanged()
+        self.assertTrue(scheduler.interval >= 10 * PollScheduler.MAX_BACKOFF *
+                                              (1 - PollScheduler.JITTER))
+        scheduler.changed()
+        self.assertTrue(scheduler.interval <= 10 * PollScheduler.FAST *
+                                              (1 + PollScheduler.JITTER))
+        for _ in xrange(10):
+            scheduler.failed()
+        self.assertTrue(scheduler.interval >=
+                        10 * PollScheduler.MAX_ERROR_BACKOFF *
+                        (1 - PollScheduler.JITTER))
+
+    def test_slot(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+        def poll():
+            with PollScheduler(1, 'test').slot():
+                with lock:
+                    running.append(1)
+                    peak.append(len(running))
+                time.sleep(.05)
+                with lock:
+                    running.pop()
+        threads = [threading.Thread(target=poll) for _ in xrange(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(max(peak), PollScheduler.MAX_CONCURRENT)
 
 
 class TestSourceMonitor(TestCase):
@@ -57,8 +103,110 @@ class TestFileSourceMonitor(TestSourceMonitor):
             config = open(self._path, 'w')
             config.write(dumps({'a': 'b', 'c': {'d': 'f'}}))
             config.close()
-            self._config_manager.merge_event.wait(1)
-            self.assertTrue(self._config_manager.merge_event.is_set())
+            self._config_manager.update_event.wait(1)
+            self.assertTrue(self._config_manager.update_event.is_set())
+        finally:
+            monitor.stop()
+
+    def test_atomic_rename(self):
+        monitor = FileSourceMonitor(self._config_manager,
+                                    'file://%s' % (self._path),
+                                    SourceMonitor.hash(self._data),
+                                    poll_interval=.2)
+        monitor.start()
+        try:
+            for i in xrange(2):
+                self._config_manager.update_event.clear()
+                fd, path = mkstemp(dir=os.path.dirname(self._path))
+                os.fdopen(fd, 'w').write(dumps({'a': 'b', 'c': {'d': i}}))
+                os.rename(path, self._path)
+                self._config_manager.update_event.wait(1)
+                self.assertTrue(self._config_manager.update_event.is_set())
+        finally:
+            monitor.stop()
+
+    def test_debounce(self):
+        if 'file_watcher' not in vars(monitor_module):
+            raise SkipTest('inotify is not available. skipping test...')
+        monitor = FileSourceMonitor(self._config_manager,
+                                    'file://%s' % (self._path),
+                                    SourceMonitor.hash(self._data))
+        monitor.start()
+        try:
+            for i in xrange(5):
+                config = open(self._path, 'w')
+                config.write(dumps({'a': 'b', 'c': {'d': i}}))
+                config.close()
+            self._config_manager.update_event.wait(1)
+            time.sleep(monitor.DEBOUNCE * 2)
+            self.assertEqual(self._config_manager.update_count, 1)
         finally:
+            start = time.time()
             monitor.stop()
+            self.assertLess(time.time() - start, .5)
 
+    def test_compressed_change(self):
+        path = '%s.json.gz' % (self._path)
+        def write(data):
+            config = gzip.open(path, 'w')
+            config.write(dumps(data))
+            config.close()
+        write(self._data)
+        monitor = FileSourceMonitor(self._config_manager,
+                                    'file://%s' % (path),
+                                    SourceMonitor.hash(self._data))
+        try:
+            with patch.object(monitor_module.Loader, 'load',
+                              wraps=monitor_module.Loader.load) as load:
+                self.assertFalse(monitor._check())
+                self.assertFalse(monitor._check())
+                self.assertEqual(load.call_count, 1)
+                write({'a': 'b'})
+                self.assertTrue(monitor._check())
+                self.assertEqual(load.call_count, 2)
+            self.assertEqual(self._config_manager.update_count, 1)
+        finally:
+            os.unlink(path)
+
+
+class TestHttpSourceMonitor(TestSourceMonitor):
+    def test_change(self):
+        server = ConfigServer()
+        server.configs['/config.json'] = self._data
+        server.start()
+        monitor = HttpSourceMonitor(self._config_manager,
+                                    server.url('/config.json'),
+                                    SourceMonitor.hash(self._data),
+                                    poll_interval=.1)
+        monitor.start()
+        try:
+            server.configs['/config.json'] = {'a': 'b', 'c': {'d': 'f'}}
+            self._config_manager.update_event.wait(1)
+            self.assertTrue(self._config_manager.update_event.is_set())
+        finally:
+            monitor.stop()
+            server.stop()
+
+
+class TestDirectorySourceMonitor(TestSourceMonitor):
+    def test_change(self):
+        path = mkdtemp()
+        try:
+            fragment = open(os.path.join(path, 'a.json'), 'w')
+            fragment.write(dumps(self._data))
+            fragment.close()
+            monitor = DirectorySourceMonitor(self._config_manager,
+                                             'dir://%s' % (path),
+                                             SourceMonitor.hash(self._data),
+                                             poll_interval=.1)
+            monitor.start()
+            try:
+                fragment = open(os.path.join(path, 'b.json'), 'w')
+                fragment.write(dumps({'c': {'d': 'f'}}))
+                fragment.close()
+                self._config_manager.update_event.wait(1)
+                self.assertTrue(self._config_manager.update_event.is_set())
+            finally:
+                monitor.stop()
+        finally:
+            shutil.rmtree(path)